@@ -1,17 +1,80 @@
 import datetime as dt
 from typing import Optional
 
+from django import forms
 from django.contrib import admin
+from django.db import connections
+from django.db.models import F
+from django.forms.models import BaseInlineFormSet
 
-from api.models import Element, Guide, Version, ElementInVersion
+from api.models import ActualVersion, Element, Guide, Version, ElementInVersion
+from api.paginator import LimitedCountPaginator
+from api.search import get_prefix_condition
 
 
 class VersionInline(admin.TabularInline):
     model = Version
 
 
+class ElementInVersionForm(forms.ModelForm):
+    def validate_unique(self):
+        """Uniqueness is checked for all inline forms at once by formset."""
+
+
+class ElementInVersionFormSet(BaseInlineFormSet):
+    def clean(self):
+        super().clean()
+        if any(self.errors):
+            return
+
+        elements_in_versions, deleted_ids = [], []
+        for form in self.forms:
+            if not form.cleaned_data:
+                continue
+
+            element_in_version = form.instance
+            if form.cleaned_data.get('DELETE'):
+                if element_in_version.pk is not None:
+                    deleted_ids.append(element_in_version.pk)
+                continue
+
+            if element_in_version.version_id is not None:
+                elements_in_versions.append(element_in_version)
+
+        # element edited or added in parent form is not saved yet, so its
+        # code and value are taken from the form's instance
+        parent_element = (
+            self.instance if isinstance(self.instance, Element) else None
+        )
+        elements = Element.objects.in_bulk(
+            {obj.element_id for obj in elements_in_versions
+             if obj.element_id is not None}
+        )
+        for obj in elements_in_versions:
+            element = elements.get(obj.element_id)
+            if (parent_element is not None) and (
+                    obj.element_id in (None, parent_element.pk)):
+                element = parent_element
+            if element is None:
+                continue
+            obj.element = element
+            obj.fill_element_attributes()
+        elements_in_versions = [
+            obj for obj in elements_in_versions if obj.code or obj.value
+        ]
+
+        ElementInVersion.objects.validate_batch(elements_in_versions,
+                                                deleted_ids=deleted_ids)
+
+
 class ElementInVersionInline(admin.TabularInline):
     model = ElementInVersion
+    form = ElementInVersionForm
+    formset = ElementInVersionFormSet
+    autocomplete_fields = ('version',)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('version__guide')
 
 
 class GuideAdmin(admin.ModelAdmin):
@@ -22,41 +85,66 @@ class GuideAdmin(admin.ModelAdmin):
         'show_actual_version_name',
         'show_actual_version_date'
     )
-    list_filter = ('title',)
+    search_fields = ('title', 'short_title')
     empty_value_display = '-пусто-'
     inlines = (VersionInline,)
     actions = ['show_actual_version_name', 'show_actual_version_date']
 
+    def get_queryset(self, request):
+        """Annotates guides with actual version from ActualVersion table."""
+
+        ActualVersion.objects.rollover_once()
+        return super().get_queryset(request).annotate(
+            actual_version_name=F('actual_version__version__name'),
+            actual_version_date=F('actual_version__version__start_date'),
+        )
+
     def show_actual_version_date(self, obj: Guide) -> Optional[dt.date]:
-        try:
-            version_date = obj.get_actual_version().start_date
-            return version_date
-        except AttributeError:
-            return
+        return getattr(obj, 'actual_version_date', None)
 
     def show_actual_version_name(self, obj: Guide) -> Optional[str]:
-        try:
-            version_name = obj.get_actual_version().name
-            return version_name
-        except AttributeError:
-            return
+        return getattr(obj, 'actual_version_name', None)
 
     show_actual_version_name.short_description = 'версия'
+    show_actual_version_name.admin_order_field = 'actual_version_name'
     show_actual_version_date.short_description = 'дата начала версии'
+    show_actual_version_date.admin_order_field = 'actual_version_date'
 
 
 class VersionAdmin(admin.ModelAdmin):
     list_display = ('name', 'guide', 'start_date')
-    list_filter = ('name',)
+    list_filter = ('start_date',)
+    search_fields = ('name', 'guide__title', 'guide__short_title')
     empty_value_display = '-пусто-'
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('guide')
+
 
 class ElementAdmin(admin.ModelAdmin):
     list_display = ('code', 'value')
-    list_filter = ('code', )
+    search_fields = ('code', 'value')
+    show_full_result_count = False
+    paginator = LimitedCountPaginator
     empty_value_display = '-пусто-'
     inlines = [ElementInVersionInline, ]
 
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Finds elements by case sensitive prefix of code or value, so that
+        indexes on code and value are used.
+        """
+
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+
+        connection = connections[queryset.db]
+        return queryset.filter(
+            get_prefix_condition(connection, 'code', search_term)
+            | get_prefix_condition(connection, 'value', search_term)
+        ), False
+
 
 admin.site.register(Element, ElementAdmin)
 admin.site.register(Guide, GuideAdmin)
@@ -1,5 +1,26 @@
+import django
 from django.apps import AppConfig
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_migrate
 
 
 class ApiConfig(AppConfig):
     name = 'api'
+
+    def ready(self):
+        if (getattr(settings, 'GLOSSARY_ASYNC_VIEWS', False)
+                and django.VERSION < (3, 1)):
+            raise ImproperlyConfigured(
+                'GLOSSARY_ASYNC_VIEWS requires Django 3.1 or later'
+            )
+
+        import api.db  # noqa: F401
+        import api.signals  # noqa: F401
+        from api.metrics import install_query_recorder, is_enabled
+        from api.search import ensure_sqlite_fts_triggers
+
+        post_migrate.connect(ensure_sqlite_fts_triggers, sender=self)
+        if is_enabled():
+            connection_created.connect(install_query_recorder)
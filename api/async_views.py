@@ -0,0 +1,92 @@
+"""
+Async variants of retrieve and validation endpoints for ASGI deployment.
+Django 3.1+ runs every sync view of ASGI application in one shared thread,
+so these views hand work over to bounded pool of db threads instead and
+process may serve many requests concurrently.
+"""
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import django
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import close_old_connections
+
+from api.views import GuideViewSet, VersionViewSet
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Returns pool of ASYNC_DB_THREADS threads, each with own connection."""
+
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'ASYNC_DB_THREADS', 16),
+                thread_name_prefix='glossary-db'
+            )
+    return _executor
+
+
+def _call_with_connections(func, *args, **kwargs):
+    """Calls func as request would do: with fresh or alive connections."""
+
+    close_old_connections()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+async def run_in_db_thread(func, *args, **kwargs):
+    """Runs blocking func in db thread with context of current task."""
+
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(
+        get_executor(),
+        functools.partial(context.run, _call_with_connections,
+                          func, *args, **kwargs)
+    )
+
+
+def _get_rendered_response(view, request, *args, **kwargs):
+    response = view(request, *args, **kwargs)
+    if hasattr(response, 'render'):
+        response.render()
+    return response
+
+
+def as_async_view(view):
+    """Wraps sync view, which is rendered in db thread."""
+
+    if django.VERSION < (3, 1):
+        raise ImproperlyConfigured('Async views require Django 3.1 or later')
+
+    async def async_view(request, *args, **kwargs):
+        return await run_in_db_thread(_get_rendered_response,
+                                      view, request, *args, **kwargs)
+
+    async_view.csrf_exempt = getattr(view, 'csrf_exempt', False)
+    return async_view
+
+
+guide_retrieve = as_async_view(
+    GuideViewSet.as_view({'get': 'retrieve'})
+)
+guide_validate = as_async_view(
+    GuideViewSet.as_view({'get': 'validate_elements_in_actual_version'})
+)
+version_retrieve = as_async_view(
+    VersionViewSet.as_view({'get': 'retrieve'})
+)
+version_validate = as_async_view(
+    VersionViewSet.as_view({'get': 'validate_elements_in_pointed_version'})
+)
@@ -0,0 +1,145 @@
+import asyncio
+import statistics
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from api.cache import bump_revisions
+from api.validation_index import validation_index
+
+
+def percentile(values, percent: float) -> float:
+    ordered = sorted(values)
+    position = min(len(ordered) - 1, int(round(percent / 100 * len(ordered))))
+    return ordered[position]
+
+
+def drop_caches() -> None:
+    """Invalidates cached responses and validation index."""
+
+    bump_revisions(all_guides=True)
+    validation_index.clear()
+
+
+def measure_request(url: str, send_request: Callable, repeat: int,
+                    before_request: Optional[Callable] = None) -> dict:
+    """
+    Sends request repeat times and returns latency percentiles in ms,
+    number of queries and peak of memory allocated by one request in KiB.
+    Memory is traced in separate request not to slow down timed ones.
+    """
+
+    timings = []
+    queries = 0
+    for _ in range(repeat):
+        if before_request is not None:
+            before_request()
+        with CaptureQueriesContext(connection) as captured_queries:
+            started_at = time.perf_counter()
+            response = send_request()
+            timings.append((time.perf_counter() - started_at) * 1000)
+        if response.status_code >= 400:
+            raise ValueError(f'{url} returned {response.status_code}')
+        queries = len(captured_queries)
+
+    if before_request is not None:
+        before_request()
+    tracemalloc.start()
+    try:
+        send_request()
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'url': url,
+        'p50_ms': round(statistics.median(timings), 3),
+        'p99_ms': round(percentile(timings, 99), 3),
+        'queries': queries,
+        'peak_memory_kb': round(peak_memory / 1024, 1),
+    }
+
+
+def measure_get(client: Client, url: str, repeat: int,
+                before_request: Optional[Callable] = None) -> dict:
+    """Measures GET request of url, see measure_request."""
+
+    return measure_request(url, lambda: client.get(url), repeat,
+                           before_request=before_request)
+
+
+def _get_throughput_result(url: str, mode: str, concurrency: int,
+                           timings: list, elapsed: float) -> dict:
+    return {
+        'url': url,
+        'mode': mode,
+        'concurrency': concurrency,
+        'rps': round(len(timings) / elapsed, 1),
+        'p50_ms': round(statistics.median(timings), 3),
+        'p99_ms': round(percentile(timings, 99), 3),
+    }
+
+
+def measure_wsgi_throughput(url: str, requests_count: int,
+                            concurrency: int) -> dict:
+    """
+    Requests url through WSGI handler from concurrency threads, as threaded
+    WSGI worker does, and returns requests per second and latencies in ms.
+    """
+
+    local = threading.local()
+
+    def request(_):
+        if not hasattr(local, 'client'):
+            local.client = Client()
+        started_at = time.perf_counter()
+        response = local.client.get(url)
+        if response.status_code >= 500:
+            raise ValueError(f'{url} returned {response.status_code}')
+        return (time.perf_counter() - started_at) * 1000
+
+    started_at = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        timings = list(executor.map(request, range(requests_count)))
+    elapsed = time.perf_counter() - started_at
+
+    return _get_throughput_result(url, 'wsgi', concurrency, timings, elapsed)
+
+
+def measure_asgi_throughput(url: str, requests_count: int,
+                            concurrency: int) -> dict:
+    """
+    Requests url through ASGI handler with concurrency requests in flight
+    and returns requests per second and latencies in ms.
+    """
+
+    from django.test import AsyncClient
+
+    async def run() -> list:
+        client = AsyncClient()
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def request():
+            async with semaphore:
+                started_at = time.perf_counter()
+                response = await client.get(url)
+                if response.status_code >= 500:
+                    raise ValueError(f'{url} returned '
+                                     f'{response.status_code}')
+                return (time.perf_counter() - started_at) * 1000
+
+        return await asyncio.gather(
+            *(request() for _ in range(requests_count))
+        )
+
+    started_at = time.perf_counter()
+    timings = asyncio.run(run())
+    elapsed = time.perf_counter() - started_at
+
+    return _get_throughput_result(url, 'asgi', concurrency, timings, elapsed)
@@ -0,0 +1,138 @@
+"""
+Bloom filters of (code, value) pairs of versions loaded into validation
+index used to reject missing elements before looking them up.
+"""
+import hashlib
+import math
+import threading
+from typing import Iterable
+
+from django.conf import settings
+
+
+def get_false_positive_rate() -> float:
+    """Returns target false positive rate of filters, 0 disables them."""
+
+    return getattr(settings, 'GLOSSARY_BLOOM_FALSE_POSITIVE_RATE', 0.01)
+
+
+class BloomFilter:
+    """Bloom filter of (code, value) pairs with double hashing."""
+
+    def __init__(self, capacity: int, false_positive_rate: float):
+        capacity = max(capacity, 1)
+        self.size = max(math.ceil(
+            -capacity * math.log(false_positive_rate) / math.log(2) ** 2
+        ), 8)
+        self.hashes_count = max(round(self.size / capacity * math.log(2)), 1)
+        self._bits = bytearray((self.size + 7) // 8)
+
+    @classmethod
+    def from_elements(cls, elements: Iterable[tuple], capacity: int,
+                      false_positive_rate: float) -> 'BloomFilter':
+        bloom_filter = cls(capacity, false_positive_rate)
+        for element in elements:
+            bloom_filter.add(element)
+        return bloom_filter
+
+    def _get_positions(self, element: tuple) -> Iterable[int]:
+        code, value = element
+        digest = hashlib.blake2b(f'{code}\0{value}'.encode(),
+                                 digest_size=16).digest()
+        first_hash = int.from_bytes(digest[:8], 'little')
+        second_hash = int.from_bytes(digest[8:], 'little') | 1
+        return (
+            (first_hash + number * second_hash) % self.size
+            for number in range(self.hashes_count)
+        )
+
+    def add(self, element: tuple) -> None:
+        for position in self._get_positions(element):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, element: tuple) -> bool:
+        bits = self._bits
+        return all(
+            bits[position >> 3] & (1 << (position & 7))
+            for position in self._get_positions(element)
+        )
+
+    @property
+    def false_positive_rate(self) -> float:
+        """Estimated false positive rate by share of set bits."""
+
+        set_bits = sum(bin(byte).count('1') for byte in self._bits)
+        return (set_bits / self.size) ** self.hashes_count
+
+
+class BloomFilterStats:
+    """
+    Counts checks of elements by filters and keeps estimated false positive
+    rate of each built filter, exposed with request metrics.
+    """
+
+    RESULTS = ('rejected', 'passed', 'false_positive')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._checks = dict.fromkeys(self.RESULTS, 0)
+        self._estimates = {}  # version_id: false positive rate
+
+    def count(self, result: str) -> None:
+        with self._lock:
+            self._checks[result] += 1
+
+    def set_estimate(self, version_id: int, rate: float) -> None:
+        with self._lock:
+            self._estimates[version_id] = rate
+
+    def discard_estimate(self, version_id: int) -> None:
+        with self._lock:
+            self._estimates.pop(version_id, None)
+
+    def clear_estimates(self) -> None:
+        with self._lock:
+            self._estimates.clear()
+
+    def render(self) -> list:
+        """Returns lines of stats in Prometheus text format."""
+
+        with self._lock:
+            checks = dict(self._checks)
+            estimates = sorted(self._estimates.items())
+
+        # all rejected elements are missing in version, so observed rate is
+        # share of false positives among checks of missing elements
+        false_positives = checks['false_positive']
+        negatives = checks['rejected'] + false_positives
+        observed_rate = false_positives / negatives if negatives else 0.0
+
+        lines = [
+            '# HELP glossary_bloom_filter_checks_total Checks of elements '
+            'by versions\' Bloom filters.',
+            '# TYPE glossary_bloom_filter_checks_total counter',
+        ]
+        lines.extend(
+            f'glossary_bloom_filter_checks_total{{result="{result}"}} '
+            f'{checks[result]}'
+            for result in self.RESULTS
+        )
+        lines.extend((
+            '# HELP glossary_bloom_filter_false_positive_rate Target, '
+            'observed and estimated by versions\' filters false positive '
+            'rate.',
+            '# TYPE glossary_bloom_filter_false_positive_rate gauge',
+            f'glossary_bloom_filter_false_positive_rate{{kind="target"}} '
+            f'{get_false_positive_rate()}',
+            f'glossary_bloom_filter_false_positive_rate{{kind="observed"}} '
+            f'{observed_rate}',
+        ))
+        lines.extend(
+            f'glossary_bloom_filter_false_positive_rate{{kind="estimated",'
+            f'version="{version_id}"}} {rate}'
+            for version_id, rate in estimates
+        )
+        return lines
+
+
+bloom_filter_stats = BloomFilterStats()
@@ -0,0 +1,119 @@
+import hashlib
+import time
+from typing import Callable, Iterable, Optional
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+from rest_framework.response import Response
+
+from api.clock import clock
+
+
+GLOBAL_REVISION_KEY = 'glossary:revision'
+GUIDE_REVISION_KEY = 'glossary:revision:guide:{}'
+RESPONSE_KEY = 'glossary:response:{}:{}'
+LAST_WRITE_KEY = 'glossary:last_write'
+
+
+def get_cache():
+    return caches[getattr(settings, 'GLOSSARY_CACHE_ALIAS', 'default')]
+
+
+def _get_revision_keys(guide_id: Optional[int]) -> list:
+    keys = [GLOBAL_REVISION_KEY]
+    if guide_id is not None:
+        keys.append(GUIDE_REVISION_KEY.format(guide_id))
+    return keys
+
+
+def _get_revisions(guide_id: Optional[int]) -> list:
+    """
+    Returns current revisions of all guides and given guide.
+    Missing revisions start from current time, so keys built before their
+    eviction are not reused.
+    """
+
+    cache = get_cache()
+    keys = _get_revision_keys(guide_id)
+    revisions = cache.get_many(keys)
+    for key in keys:
+        if key not in revisions:
+            cache.add(key, time.time_ns(), timeout=None)
+            revisions[key] = cache.get(key)
+    return [revisions[key] for key in keys]
+
+
+def bump_revisions(guides_ids: Iterable[int] = (),
+                   all_guides: bool = False) -> None:
+    """Invalidates cached responses of given guides or of all guides."""
+
+    cache = get_cache()
+    keys = [GUIDE_REVISION_KEY.format(guide_id) for guide_id in guides_ids]
+    if all_guides:
+        keys.append(GLOBAL_REVISION_KEY)
+
+    for key in keys:
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, time.time_ns(), timeout=None)
+    cache.set(LAST_WRITE_KEY, time.time(), timeout=None)
+
+
+def get_cached_response(request, guide_id: Optional[int],
+                        get_response: Callable):
+    """
+    Returns response data cached by request URL, accepted media type,
+    current date and revisions of guides, honoring conditional headers
+    with cached ETag and Last-Modified. URL includes host since pagination
+    links of cached data are absolute.
+    Successful responses built by get_response are stored in cache.
+    """
+
+    cache = get_cache()
+    key_parts = [
+        request.build_absolute_uri(),
+        request.accepted_media_type,
+        clock.today(),
+        *_get_revisions(guide_id),
+    ]
+    key_hash = hashlib.sha1(
+        '|'.join(str(part) for part in key_parts).encode()
+    ).hexdigest()
+    key = RESPONSE_KEY.format(guide_id or '', key_hash)
+
+    cached = cache.get(key)
+    if cached is not None:
+        data, status_code, headers = cached
+        last_modified = headers.get('Last-Modified')
+        response = get_conditional_response(
+            request,
+            etag=headers.get('ETag'),
+            last_modified=(parse_http_date_safe(last_modified)
+                           if last_modified else None),
+        )
+        if response is None:
+            response = Response(data, status=status_code)
+        for header, value in headers.items():
+            response[header] = value
+        return response
+
+    response = get_response()
+    if isinstance(response, Response) and response.status_code in (200, 404):
+        headers = {
+            header: response[header]
+            for header in ('ETag', 'Last-Modified')
+            if response.has_header(header)
+        }
+        # Entries do not outlive current date: at midnight keys change
+        # together with date, so stale ones are not kept until timeout.
+        timeout = getattr(settings, 'GLOSSARY_CACHE_TIMEOUT', 300)
+        seconds_until_tomorrow = clock.seconds_until_tomorrow()
+        if seconds_until_tomorrow is not None:
+            timeout = min(timeout, seconds_until_tomorrow)
+        cache.set(key, (response.data, response.status_code, headers),
+                  timeout=timeout)
+
+    return response
@@ -0,0 +1,79 @@
+import datetime as dt
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+from django.conf import settings
+from django.utils import timezone
+
+
+class Clock:
+    """
+    Source of current date in configured TIME_ZONE.
+    Date is computed once and memoized until next midnight, so asking for
+    it costs one time() call per request while long-running processes
+    switch to the new date right after midnight.
+    Date could be frozen by override() in tests.
+    """
+
+    def __init__(self):
+        self._state = (None, 0.0)  # (today, timestamp of next midnight)
+        self._frozen_date = None
+
+    def _compute_state(self) -> tuple:
+        if settings.USE_TZ:
+            today = timezone.localdate()
+            next_midnight = timezone.make_aware(
+                dt.datetime.combine(today + dt.timedelta(days=1), dt.time()),
+                is_dst=False
+            )
+        else:
+            today = dt.date.today()
+            next_midnight = dt.datetime.combine(
+                today + dt.timedelta(days=1), dt.time()
+            )
+        return today, next_midnight.timestamp()
+
+    def today(self) -> dt.date:
+        """Returns current date."""
+
+        if self._frozen_date is not None:
+            return self._frozen_date
+
+        today, next_midnight_timestamp = self._state
+        if time.time() >= next_midnight_timestamp:
+            self._state = self._compute_state()
+            today, _ = self._state
+
+        return today
+
+    @property
+    def is_overridden(self) -> bool:
+        return self._frozen_date is not None
+
+    def seconds_until_tomorrow(self) -> Optional[int]:
+        """Returns seconds left until current date changes or none."""
+
+        if self._frozen_date is not None:
+            return
+
+        self.today()
+        _, next_midnight_timestamp = self._state
+        return max(int(next_midnight_timestamp - time.time()) + 1, 1)
+
+    def reset(self) -> None:
+        self._state = (None, 0.0)
+
+    @contextmanager
+    def override(self, date: dt.date):
+        """Freezes current date for the block."""
+
+        previous_date = self._frozen_date
+        self._frozen_date = date
+        try:
+            yield
+        finally:
+            self._frozen_date = previous_date
+
+
+clock = Clock()
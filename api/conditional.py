@@ -0,0 +1,63 @@
+import datetime as dt
+import hashlib
+from typing import Callable, Optional
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+
+def make_etag(*parts) -> str:
+    """Returns strong ETag built from hash of given parts."""
+
+    content = '|'.join(str(part) for part in parts)
+    return '"{}"'.format(hashlib.sha1(content.encode()).hexdigest())
+
+
+def get_last_modified(*moments) -> Optional[dt.datetime]:
+    """
+    Returns latest of given datetimes and dates, dates are taken at start
+    of day. Start dates of versions should be passed with their updated_at
+    as versions resolved by date become actual without being modified.
+    """
+
+    datetimes = []
+    for moment in moments:
+        if moment is None:
+            continue
+        if not isinstance(moment, dt.datetime):
+            moment = dt.datetime.combine(moment, dt.time.min)
+            if settings.USE_TZ:
+                moment = timezone.make_aware(moment)
+        datetimes.append(moment)
+
+    return max(datetimes) if datetimes else None
+
+
+def get_conditional_or_full_response(request, etag: str, last_modified,
+                                     get_response: Callable):
+    """
+    Returns 304 response if request's If-None-Match/If-Modified-Since
+    validators match, otherwise response built by get_response.
+    Both responses get ETag and Last-Modified headers.
+    """
+
+    last_modified_timestamp: Optional[int] = None
+    if last_modified is not None:
+        last_modified_timestamp = int(last_modified.timestamp())
+
+    response = get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=last_modified_timestamp,
+    )
+    if response is None:
+        response = get_response()
+
+    if response.status_code in (200, 304):
+        response['ETag'] = etag
+        if last_modified_timestamp is not None:
+            response['Last-Modified'] = http_date(last_modified_timestamp)
+
+    return response
@@ -0,0 +1,67 @@
+from django.conf import settings
+from django.core.signals import request_started
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+# Pragmas for read-heavy single node: readers are not blocked by writer
+# in WAL mode and fsync is done on checkpoints only.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'temp_store': 'MEMORY',
+    'cache_size': -64000,  # KiB
+    'mmap_size': 268435456,
+}
+
+
+@receiver(connection_created)
+def set_sqlite_pragmas(sender, connection, **kwargs):
+    """Tunes every new SQLite connection with SQLITE_PRAGMAS."""
+
+    if connection.vendor != 'sqlite':
+        return
+
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', SQLITE_PRAGMAS)
+    with connection.cursor() as cursor:
+        for pragma, value in pragmas.items():
+            cursor.execute(f'PRAGMA {pragma} = {value}')
+
+
+# SQLite UPPER and LIKE fold ASCII letters only, so case insensitive
+# search uses this function which uppercases any letters.
+SQLITE_UPPER_FUNCTION = 'glossary_upper'
+
+
+def _upper(value):
+    return None if value is None else value.upper()
+
+
+@receiver(connection_created)
+def register_sqlite_functions(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+
+    connection.connection.create_function(SQLITE_UPPER_FUNCTION, 1, _upper,
+                                          deterministic=True)
+
+
+@receiver(request_started)
+def check_connections_health(sender, **kwargs):
+    """
+    Closes persistent connections which are not usable any more, e.g. after
+    database restart, so request gets new connection instead of error.
+    Enabled by CONN_HEALTH_CHECKS option of database with positive
+    CONN_MAX_AGE, other connections are closed after every request.
+    """
+
+    for connection in connections.all():
+        if connection.connection is None:
+            continue
+        if not connection.settings_dict.get('CONN_HEALTH_CHECKS'):
+            continue
+        if not connection.settings_dict.get('CONN_MAX_AGE'):
+            continue
+        if not connection.is_usable():
+            connection.close()
@@ -0,0 +1,57 @@
+from typing import Optional
+
+from django.conf import settings
+
+from api.cache import get_cache
+from api.models import ElementInVersion, Version
+
+
+DIFF_KEY = 'glossary:diff:{}:{}:{}:{}'
+
+
+def get_version_diff(version: Version, from_version: Version) -> dict:
+    """
+    Returns rows of elements added to version and removed from it since
+    version from. Diff is cached per pair of versions' revisions, so it is
+    recomputed only after elements of one of them are changed.
+    """
+
+    cache = get_cache()
+    key = DIFF_KEY.format(from_version.pk, from_version.revision,
+                          version.pk, version.revision)
+    diff = cache.get(key)
+    if diff is None:
+        added, removed = ElementInVersion.objects.diff(version.pk,
+                                                       from_version.pk)
+        diff = {'added': list(added), 'removed': list(removed)}
+        cache.set(key, diff,
+                  timeout=getattr(settings, 'GLOSSARY_DIFF_CACHE_TIMEOUT',
+                                  86400))
+    return diff
+
+
+def get_previous_version(version: Version) -> Optional[Version]:
+    return Version.objects.filter(
+        guide_id=version.guide_id,
+        start_date__lt=version.start_date
+    ).order_by(
+        '-start_date', '-pk'
+    ).first()
+
+
+def precompute_version_diff(version_id: int) -> None:
+    """
+    Caches diff of published version with previous version of its guide
+    if GLOSSARY_PRECOMPUTE_DIFFS setting is on.
+    """
+
+    if not getattr(settings, 'GLOSSARY_PRECOMPUTE_DIFFS', False):
+        return
+
+    version = Version.objects.filter(pk=version_id).first()
+    if version is None:
+        return
+
+    previous_version = get_previous_version(version)
+    if previous_version is not None:
+        get_version_diff(version, previous_version)
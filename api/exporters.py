@@ -0,0 +1,61 @@
+import csv
+import json
+from typing import Iterable, Iterator
+
+from api.models import ElementInVersion
+
+
+EXPORT_FIELDS = ('id', 'code', 'value', 'guide_id')
+EXPORT_CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8',
+}
+EXPORT_CHUNK_SIZE = 2000
+
+
+class _EchoBuffer:
+    """File-like object returning written value for csv.writer."""
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def iter_version_element_rows(version_id: int, guide_id: str,
+                              chunk_size: int = EXPORT_CHUNK_SIZE
+                              ) -> Iterator[tuple]:
+    """
+    Yields (id, code, value, guide_id) of version's elements ordered by code
+    reading them by server-side iterator without model instances.
+    guide_id is given as in URL like in element serializers.
+    """
+
+    rows = ElementInVersion.objects.filter(
+        version_id=version_id
+    ).order_by(
+        'code'
+    ).values_list(
+        'element_id', 'code', 'value'
+    ).iterator(
+        chunk_size=chunk_size
+    )
+    for element_id, code, value in rows:
+        yield element_id, code, value, guide_id
+
+
+def iter_ndjson(rows: Iterable[tuple]) -> Iterator[str]:
+    for row in rows:
+        yield json.dumps(dict(zip(EXPORT_FIELDS, row)),
+                         ensure_ascii=False, separators=(',', ':')) + '\n'
+
+
+def iter_csv(rows: Iterable[tuple]) -> Iterator[str]:
+    writer = csv.writer(_EchoBuffer())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+EXPORT_WRITERS = {
+    'ndjson': iter_ndjson,
+    'csv': iter_csv,
+}
@@ -0,0 +1,199 @@
+import csv
+import json
+import os
+import time
+from itertools import islice
+from typing import Callable, Iterable, Iterator, List, Optional, TextIO
+
+from django.db import transaction
+
+from api.models import Element, ElementInVersion, Version
+from api.signals import on_version_elements_changed
+
+
+IMPORT_FORMATS = ('csv', 'jsonl')
+# Skips byte order mark which Excel writes at start of UTF-8 CSV files.
+IMPORT_ENCODING = 'utf-8-sig'
+DEFAULT_BATCH_SIZE = 1000
+
+
+class GlossaryImportError(Exception):
+    pass
+
+
+def iter_csv_rows(file: TextIO) -> Iterator[dict]:
+    """Yields rows of CSV file with 'code' and 'value' columns."""
+
+    yield from csv.DictReader(file)
+
+
+def iter_jsonl_rows(file: TextIO) -> Iterator[dict]:
+    """Yields rows of JSON lines file with 'code' and 'value' keys."""
+
+    for line_number, line in enumerate(file, start=1):
+        line = line.strip()
+        if not line:
+            continue
+
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as error:
+            raise GlossaryImportError(
+                f'Line {line_number}: invalid JSON: {error.msg}'
+            )
+        if not isinstance(row, dict):
+            raise GlossaryImportError(
+                f'Line {line_number}: JSON object expected'
+            )
+        yield row
+
+
+def get_import_format(path: str, file_format: Optional[str] = None) -> str:
+    """Returns import format pointed directly or by file extension."""
+
+    if file_format is None:
+        file_format = os.path.splitext(path)[1].lstrip('.').lower()
+        if file_format == 'ndjson':
+            file_format = 'jsonl'
+
+    if file_format not in IMPORT_FORMATS:
+        raise GlossaryImportError(f'Unknown import format: {file_format}')
+
+    return file_format
+
+
+def iter_file_rows(file: TextIO, file_format: str) -> Iterator[dict]:
+    if file_format == 'csv':
+        return iter_csv_rows(file)
+    return iter_jsonl_rows(file)
+
+
+class ImportResult:
+    def __init__(self):
+        self.rows = 0
+        self.linked = 0
+        self.already_in_version = 0
+        self.rejected = []  # (row number, reason)
+        self.started_at = time.monotonic()
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at
+
+    @property
+    def rows_per_second(self) -> float:
+        elapsed = self.elapsed
+        return self.rows / elapsed if elapsed else 0.0
+
+
+class GlossaryImporter:
+    """
+    Loads elements into guide's version by batches.
+    Uniqueness of code and value inside version is checked with in-memory
+    sets and guarded by version's unique constraints in db, elements are
+    upserted with bulk_create and linked to version with bulk
+    ElementInVersion inserts, each batch in its own transaction.
+    """
+
+    def __init__(
+            self,
+            version: Version,
+            batch_size: int = DEFAULT_BATCH_SIZE,
+            progress_callback: Optional[Callable[[ImportResult], None]] = None,
+    ):
+        self._version = version
+        self._batch_size = batch_size
+        self._progress_callback = progress_callback
+        self._pairs = set()
+        self._codes = set()
+        self._values = set()
+
+    def _load_version_elements(self) -> None:
+        pairs = ElementInVersion.objects.filter(
+            version=self._version
+        ).values_list(
+            'code', 'value'
+        )
+        for code, value in pairs:
+            self._pairs.add((code, value))
+            self._codes.add(code)
+            self._values.add(value)
+
+    def _get_new_pairs(self, rows: List[tuple],
+                       result: ImportResult) -> List[tuple]:
+        """Returns pairs of batch which are not in version yet."""
+
+        new_pairs = []
+        for row_number, row in rows:
+            code = row.get('code')
+            value = row.get('value')
+
+            if not code or not value:
+                result.rejected.append((row_number, 'no code/value'))
+                continue
+
+            code, value = str(code), str(value)
+            if (code, value) in self._pairs:
+                result.already_in_version += 1
+                continue
+            if code in self._codes:
+                result.rejected.append((row_number, 'code in version'))
+                continue
+            if value in self._values:
+                result.rejected.append((row_number, 'value in version'))
+                continue
+
+            self._pairs.add((code, value))
+            self._codes.add(code)
+            self._values.add(value)
+            new_pairs.append((code, value))
+
+        return new_pairs
+
+    def _import_pairs(self, pairs: List[tuple]) -> None:
+        Element.objects.bulk_create(
+            [Element(code=code, value=value) for code, value in pairs],
+            ignore_conflicts=True,
+        )
+        pairs_set = set(pairs)
+        elements = [
+            (element_id, code, value)
+            for element_id, code, value in Element.objects.filter(
+                code__in={code for code, _ in pairs}
+            ).values_list(
+                'id', 'code', 'value'
+            )
+            if (code, value) in pairs_set
+        ]
+        ElementInVersion.objects.bulk_create(
+            [
+                ElementInVersion(version=self._version, element_id=element_id,
+                                 code=code, value=value)
+                for element_id, code, value in elements
+            ]
+        )
+
+    def import_rows(self, rows: Iterable[dict]) -> ImportResult:
+        result = ImportResult()
+        self._load_version_elements()
+
+        numbered_rows = enumerate(rows, start=1)
+        try:
+            while True:
+                batch = list(islice(numbered_rows, self._batch_size))
+                if not batch:
+                    break
+
+                new_pairs = self._get_new_pairs(batch, result)
+                if new_pairs:
+                    with transaction.atomic():
+                        self._import_pairs(new_pairs)
+
+                result.rows += len(batch)
+                result.linked += len(new_pairs)
+                if self._progress_callback is not None:
+                    self._progress_callback(result)
+        finally:
+            on_version_elements_changed([self._version.pk])
+
+        return result
@@ -0,0 +1,143 @@
+import datetime as dt
+import json
+import platform
+from urllib.parse import urlencode
+
+import django
+import rest_framework
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import override_settings
+from rest_framework.test import APIClient
+
+from api.benchmarks import drop_caches, measure_request
+from api.models import (ActualVersion, Element, ElementInVersion, Guide,
+                        Version)
+
+
+MODES = ('warm', 'cold')
+
+
+class Command(BaseCommand):
+    help = ('Measures latency, query count and peak memory of read and '
+            'validation endpoints on existing data (see generate_glossary) '
+            'with warm caches and with caches dropped before each request. '
+            'Writes JSON report which could be compared with previous one.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--guide', type=int,
+                            help='id of guide with actual version, first '
+                                 'one by default')
+        parser.add_argument('--repeat', type=int, default=50)
+        parser.add_argument('--modes', nargs='+', choices=MODES,
+                            default=list(MODES))
+        parser.add_argument('--output', help='path of JSON report')
+        parser.add_argument('--compare', help='path of previous JSON report')
+
+    def _get_urls(self, guide_id) -> dict:
+        actual_versions = ActualVersion.objects.filter(version__isnull=False)
+        if guide_id is not None:
+            actual_versions = actual_versions.filter(guide_id=guide_id)
+        actual_version = actual_versions.order_by('guide_id').first()
+        if actual_version is None:
+            raise CommandError('No guide with actual version, '
+                               'run generate_glossary first')
+
+        guide_id, version_id = (actual_version.guide_id,
+                                actual_version.version_id)
+        version_elements = ElementInVersion.objects.filter(
+            version_id=version_id
+        ).order_by(
+            'code'
+        )
+        elements_count = version_elements.count()
+        if not elements_count:
+            raise CommandError(f'Actual version {version_id} of guide '
+                               f'{guide_id} has no elements')
+
+        code, value = version_elements.values_list('code', 'value')[
+            elements_count // 2
+        ]
+        element_query = urlencode({'code': code, 'value': value})
+        guide_url = f'/api/v1/guides/{guide_id}/'
+        version_url = f'{guide_url}versions/{version_id}/'
+
+        return {
+            'guides_list': '/api/v1/guides/',
+            'guide_retrieve': guide_url,
+            'version_retrieve': version_url,
+            'guide_validate': f'{guide_url}validate/?{element_query}',
+            'version_validate': f'{version_url}validate/?{element_query}',
+        }
+
+    def _get_environment(self) -> dict:
+        return {
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'djangorestframework': rest_framework.VERSION,
+            'database': connection.vendor,
+        }
+
+    def _get_dataset(self) -> dict:
+        return {
+            'guides': Guide.objects.count(),
+            'versions': Version.objects.count(),
+            'elements': Element.objects.count(),
+            'elements_in_versions': ElementInVersion.objects.count(),
+        }
+
+    def _write_comparison(self, results: list, path: str) -> None:
+        with open(path, encoding='utf-8') as file:
+            previous_results = {
+                (result['name'], result['mode']): result
+                for result in json.load(file)['results']
+            }
+
+        for result in results:
+            previous = previous_results.get((result['name'], result['mode']))
+            if previous is None:
+                continue
+            self.stdout.write(
+                f'{result["name"]} ({result["mode"]}): '
+                f'p50 x{result["p50_ms"] / previous["p50_ms"]:.2f}, '
+                f'p99 x{result["p99_ms"] / previous["p99_ms"]:.2f}, '
+                f'queries {previous["queries"]} -> {result["queries"]}, '
+                f'memory {previous["peak_memory_kb"]} -> '
+                f'{result["peak_memory_kb"]} KiB'
+            )
+
+    @override_settings(ALLOWED_HOSTS=['testserver'])
+    def handle(self, *args, **options):
+        urls = self._get_urls(options['guide'])
+        client = APIClient()
+        results = []
+        for mode in options['modes']:
+            before_request = drop_caches if mode == 'cold' else None
+            for name, url in urls.items():
+                result = measure_request(
+                    url,
+                    lambda: client.get(url),
+                    options['repeat'],
+                    before_request=before_request,
+                )
+                result.update(name=name, mode=mode)
+                results.append(result)
+                self.stdout.write(
+                    f'{name} ({mode}): p50 {result["p50_ms"]} ms, '
+                    f'p99 {result["p99_ms"]} ms, {result["queries"]} '
+                    f'queries, {result["peak_memory_kb"]} KiB'
+                )
+
+        report = {
+            'created_at': dt.datetime.now().isoformat(timespec='seconds'),
+            'environment': self._get_environment(),
+            'dataset': self._get_dataset(),
+            'repeat': options['repeat'],
+            'results': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+
+        if options['compare']:
+            self._write_comparison(results, options['compare'])
@@ -0,0 +1,56 @@
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+from django.urls import include, path
+
+from api.benchmarks import measure_asgi_throughput, measure_wsgi_throughput
+from api.urls import get_async_urlpatterns, router_v1
+
+
+class Command(BaseCommand):
+    help = ('Compares throughput of urls served by WSGI handler with sync '
+            'views and by ASGI handler with async views on existing data. '
+            'Set CACHE_URL=dummycache:// to measure without response cache.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('urls', nargs='+',
+                            help='e.g. /api/v1/guides/1/validate/?code=1&'
+                                 'value=a')
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument('--concurrency', type=int, default=50)
+        parser.add_argument('--wsgi-threads', type=int, default=1,
+                            help='threads of WSGI worker')
+
+    def _write_result(self, result: dict) -> None:
+        self.stdout.write(
+            f'{result["mode"]} x{result["concurrency"]} {result["url"]}: '
+            f'{result["rps"]} rps, p50 {result["p50_ms"]} ms, '
+            f'p99 {result["p99_ms"]} ms'
+        )
+
+    def handle(self, *args, **options):
+        if django.VERSION < (3, 1):
+            raise CommandError('ASGI benchmark requires Django 3.1 or later')
+
+        class sync_urlconf:
+            urlpatterns = [
+                path('api/v1/', include(router_v1.urls)),
+            ]
+
+        class async_urlconf:
+            urlpatterns = [
+                path('api/v1/', include(get_async_urlpatterns()
+                                        + router_v1.urls)),
+            ]
+
+        for url in options['urls']:
+            with override_settings(ALLOWED_HOSTS=['testserver'],
+                                   ROOT_URLCONF=sync_urlconf):
+                self._write_result(measure_wsgi_throughput(
+                    url, options['requests'], options['wsgi_threads']
+                ))
+            with override_settings(ALLOWED_HOSTS=['testserver'],
+                                   ROOT_URLCONF=async_urlconf):
+                self._write_result(measure_asgi_throughput(
+                    url, options['requests'], options['concurrency']
+                ))
@@ -0,0 +1,71 @@
+import datetime as dt
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import Client, override_settings
+
+from api.benchmarks import drop_caches, measure_get
+from api.models import ActualVersion, Guide, Version
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = ('Measures /guides/ query count and latency for growing number '
+            'of guides without caches. Data is created in transaction and '
+            'rolled back.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+',
+                            default=[10, 100, 1000, 10000])
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def _create_guides(self, start: int, stop: int) -> None:
+        Guide.objects.bulk_create(
+            Guide(title=f'Справочник {number}', short_title=f'sp{number}')
+            for number in range(start, stop)
+        )
+        start_date = dt.date(2021, 1, 1)
+        Version.objects.bulk_create(
+            Version(guide_id=guide_id, name='v1', start_date=start_date)
+            for guide_id in Guide.objects.filter(
+                versions__isnull=True
+            ).values_list(
+                'pk', flat=True
+            )
+        )
+        ActualVersion.objects.bulk_create(
+            ActualVersion(guide_id=guide_id, version_id=version_id,
+                          effective_from=start_date)
+            for guide_id, version_id in Version.objects.filter(
+                guide__actual_version__isnull=True
+            ).values_list(
+                'guide_id', 'pk'
+            )
+        )
+
+    def _run(self, sizes, repeat: int) -> None:
+        client = Client()
+        created = 0
+        for size in sorted(sizes):
+            self._create_guides(created, size)
+            created = size
+            for url in ('/api/v1/guides/', '/api/v1/guides/?limit=50',
+                        '/api/v1/guides/?search_date=2021-06-01&limit=50'):
+                result = measure_get(client, url, repeat,
+                                     before_request=drop_caches)
+                self.stdout.write(
+                    f'{size:>6} guides {url}: {result["queries"]} queries, '
+                    f'p50 {result["p50_ms"]} ms, p99 {result["p99_ms"]} ms'
+                )
+
+    @override_settings(ALLOWED_HOSTS=['testserver'])
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._run(options['sizes'], options['repeat'])
+                raise _Rollback
+        except _Rollback:
+            pass
@@ -0,0 +1,80 @@
+import datetime as dt
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from api.models import Element, Guide, Version
+from api.serializers import (ElementSerializer, FastElementSerializer,
+                             FastGuideSerializer, GuideSerializer)
+
+
+class Command(BaseCommand):
+    help = ('Compares time of fast read-only serializers with model '
+            'serializers on in-memory rows and checks equal output.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def _measure(self, serialize, repeat: int):
+        best_time, content = None, None
+        for _ in range(repeat):
+            started_at = time.perf_counter()
+            content = JSONRenderer().render(serialize())
+            elapsed = time.perf_counter() - started_at
+            best_time = min(best_time or elapsed, elapsed)
+        return best_time, content
+
+    def _compare(self, name: str, serialize, fast_serialize, repeat: int):
+        model_time, model_content = self._measure(serialize, repeat)
+        fast_time, fast_content = self._measure(fast_serialize, repeat)
+        if model_content != fast_content:
+            raise CommandError(f'{name}: fast serializer output differs')
+
+        self.stdout.write(
+            f'{name}: {model_time * 1000:.1f} ms -> '
+            f'{fast_time * 1000:.1f} ms ({model_time / fast_time:.1f}x)'
+        )
+
+    def handle(self, *args, **options):
+        rows_count, repeat = options['rows'], options['repeat']
+
+        element_rows = [
+            (number, f'{number:08}', f'значение {number}')
+            for number in range(rows_count)
+        ]
+        elements = [
+            Element(id=element_id, code=code, value=value)
+            for element_id, code, value in element_rows
+        ]
+        self._compare(
+            'elements',
+            lambda: ElementSerializer(elements, many=True,
+                                      context={'guide_id': '1'}).data,
+            lambda: FastElementSerializer(element_rows, guide_id='1').data,
+            repeat,
+        )
+
+        start_date = dt.date(2021, 1, 1)
+        guide_rows = [
+            (f'Справочник {number}', number, f'sp{number}',
+             f'описание {number}', f'v.{number}', start_date)
+            for number in range(rows_count)
+        ]
+        versions = [
+            Version(
+                guide=Guide(id=guide_id, title=title, short_title=short_title,
+                            description=description),
+                name=name,
+                start_date=version_start_date,
+            )
+            for (title, guide_id, short_title, description, name,
+                 version_start_date) in guide_rows
+        ]
+        self._compare(
+            'guides',
+            lambda: GuideSerializer(versions, many=True).data,
+            lambda: FastGuideSerializer(guide_rows).data,
+            repeat,
+        )
@@ -0,0 +1,90 @@
+import datetime as dt
+from typing import Iterator
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.importers import DEFAULT_BATCH_SIZE, GlossaryImporter
+from api.models import Guide, Version
+
+
+def iter_version_rows(guide_number: int, first_element: int,
+                      elements_count: int) -> Iterator[dict]:
+    """Yields code/value of elements with numbers in window of version."""
+
+    for element_number in range(first_element,
+                                first_element + elements_count):
+        yield {
+            'code': f'{guide_number:04}{element_number:08}',
+            'value': f'элемент {element_number} справочника {guide_number}',
+        }
+
+
+class Command(BaseCommand):
+    help = ('Generates guides with versions and elements for benchmarks. '
+            'Next version of guide takes --shared part of elements of '
+            'previous one, so elements are reused across versions.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--guides', type=int, default=10)
+        parser.add_argument('--versions', type=int, default=3,
+                            help='versions of each guide')
+        parser.add_argument('--elements', type=int, default=1000,
+                            help='elements of each version')
+        parser.add_argument('--shared', type=float, default=0.9,
+                            help='part of elements taken from previous '
+                                 'version, 0..1')
+        parser.add_argument('--start-date', type=dt.date.fromisoformat,
+                            default=dt.date(2021, 1, 1),
+                            help='start date of first versions (YYYY-mm-dd)')
+        parser.add_argument('--prefix', default='gen',
+                            help='prefix of guides short titles')
+        parser.add_argument('--batch-size', type=int,
+                            default=DEFAULT_BATCH_SIZE)
+
+    def _create_guide(self, number: int, prefix: str) -> Guide:
+        short_title = f'{prefix}{number}'
+        if Guide.objects.filter(short_title=short_title).exists():
+            raise CommandError(f'Guide {short_title} already exists, '
+                               f'pass other --prefix')
+
+        return Guide.objects.create(
+            title=f'Справочник {prefix} {number}',
+            short_title=short_title,
+            description=f'Сгенерированный справочник {number}',
+        )
+
+    def handle(self, *args, **options):
+        if not 0 <= options['shared'] <= 1:
+            raise CommandError('--shared should be between 0 and 1')
+
+        elements_count = options['elements']
+        new_elements_count = round(elements_count * (1 - options['shared']))
+
+        for guide_number in range(1, options['guides'] + 1):
+            guide = self._create_guide(guide_number, options['prefix'])
+            for version_number in range(options['versions']):
+                version = Version.objects.create(
+                    guide=guide,
+                    name=f'{version_number + 1}.0',
+                    start_date=options['start_date'] + dt.timedelta(
+                        days=30 * version_number
+                    ),
+                )
+                importer = GlossaryImporter(
+                    version=version,
+                    batch_size=options['batch_size'],
+                )
+                result = importer.import_rows(iter_version_rows(
+                    guide_number,
+                    version_number * new_elements_count,
+                    elements_count,
+                ))
+                self.stdout.write(
+                    f'{version}: {result.linked} elements, '
+                    f'{result.rows_per_second:.0f} rows/sec'
+                )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated {options["guides"]} guides with '
+            f'{options["versions"]} versions of {elements_count} elements'
+        ))
@@ -0,0 +1,96 @@
+import datetime as dt
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.diffs import precompute_version_diff
+from api.importers import (DEFAULT_BATCH_SIZE, IMPORT_ENCODING,
+                           IMPORT_FORMATS, GlossaryImporter,
+                           GlossaryImportError, get_import_format,
+                           iter_file_rows)
+from api.models import Guide, Version
+from api.snapshots import write_version_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Imports elements of guide version from CSV or JSON lines file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or JSON lines file path')
+        parser.add_argument('--guide', required=True,
+                            help='short title of guide')
+        parser.add_argument('--guide-title',
+                            help='title of guide, creates guide if missing')
+        parser.add_argument('--version-name', required=True,
+                            help='name of guide version')
+        parser.add_argument('--start-date', type=dt.date.fromisoformat,
+                            help='start date of version, creates version if '
+                                 'missing (YYYY-mm-dd)')
+        parser.add_argument('--format', choices=IMPORT_FORMATS,
+                            help='file format, by default file extension')
+        parser.add_argument('--batch-size', type=int,
+                            default=DEFAULT_BATCH_SIZE)
+
+    def _get_guide(self, options) -> Guide:
+        guide = Guide.objects.filter(short_title=options['guide']).first()
+        if guide is not None:
+            return guide
+
+        if options['guide_title'] is None:
+            raise CommandError('No such guide, pass --guide-title to create')
+
+        return Guide.objects.create(title=options['guide_title'],
+                                    short_title=options['guide'])
+
+    def _get_version(self, guide: Guide, options) -> Version:
+        version = guide.versions.filter(name=options['version_name']).first()
+        if version is not None:
+            return version
+
+        if options['start_date'] is None:
+            raise CommandError('No such version, pass --start-date to create')
+
+        return Version.objects.create(guide=guide,
+                                      name=options['version_name'],
+                                      start_date=options['start_date'])
+
+    def _write_progress(self, result):
+        self.stdout.write(
+            f'{result.rows} rows, {result.rows_per_second:.0f} rows/sec'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            file_format = get_import_format(options['path'],
+                                            options['format'])
+        except GlossaryImportError as error:
+            raise CommandError(error)
+
+        guide = self._get_guide(options)
+        version = self._get_version(guide, options)
+        importer = GlossaryImporter(
+            version=version,
+            batch_size=options['batch_size'],
+            progress_callback=self._write_progress,
+        )
+
+        with open(options['path'], encoding=IMPORT_ENCODING,
+                  newline='') as file:
+            try:
+                result = importer.import_rows(
+                    iter_file_rows(file, file_format)
+                )
+            except GlossaryImportError as error:
+                raise CommandError(error)
+
+        precompute_version_diff(version.pk)
+        write_version_snapshot(version.pk)
+
+        for row_number, reason in result.rejected:
+            self.stderr.write(f'row {row_number} rejected: {reason}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {result.linked} elements into {version} '
+            f'({result.already_in_version} already in version, '
+            f'{len(result.rejected)} rejected) in {result.elapsed:.1f} sec, '
+            f'{result.rows_per_second:.0f} rows/sec'
+        ))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.models import Version
+from api.snapshots import get_snapshot_dir, write_version_snapshot
+
+
+class Command(BaseCommand):
+    help = ('Writes memory-mapped snapshots of versions\' elements to '
+            'GLOSSARY_SNAPSHOT_DIR. Should be run after versions are '
+            'changed, changed versions are read from db until then.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--versions', type=int, nargs='+',
+                            dest='versions_ids',
+                            help='ids of versions, all versions by default')
+
+    def handle(self, *args, **options):
+        if not get_snapshot_dir():
+            raise CommandError('GLOSSARY_SNAPSHOT_DIR setting is not set')
+
+        versions_ids = Version.objects.order_by('pk').values_list(
+            'pk', flat=True
+        )
+        if options['versions_ids']:
+            versions_ids = versions_ids.filter(pk__in=options['versions_ids'])
+
+        for version_id in versions_ids:
+            path = write_version_snapshot(version_id)
+            self.stdout.write(path)
+
+        self.stdout.write(self.style.SUCCESS('Snapshots are published'))
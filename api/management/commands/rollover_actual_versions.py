@@ -0,0 +1,25 @@
+import datetime as dt
+
+from django.core.management.base import BaseCommand
+
+from api.models import ActualVersion
+
+
+class Command(BaseCommand):
+    help = ('Moves guides to versions which become actual for the date. '
+            'Should be run daily.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', type=dt.date.fromisoformat,
+                            help='date of rollover (YYYY-mm-dd), '
+                                 'current date by default')
+        parser.add_argument('--all', action='store_true',
+                            help='recompute actual versions of all guides')
+
+    def handle(self, *args, **options):
+        if options['all']:
+            ActualVersion.objects.refresh_all(date=options['date'])
+        else:
+            ActualVersion.objects.rollover(date=options['date'])
+
+        self.stdout.write(self.style.SUCCESS('Actual versions are updated'))
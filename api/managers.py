@@ -1,47 +1,345 @@
-import datetime as dt
+from typing import Iterable
 
+from django.core.exceptions import ValidationError
 from django.db import models
-from django.db.models import OuterRef, Subquery
+from django.db.models import F, Q
+from django.utils import timezone
 
-
-CURRENT_DATE = dt.date.today()
+from api.clock import clock
 
 
 class VersionQuerySet(models.QuerySet):
     def get_valid_to_date_versions(self, date):
         return self.filter(start_date__lte=date)
 
-    def get_only_actual_versions(self):
-        sq = self.filter(
-            guide_id=OuterRef('guide_id')
-        ).order_by(
-            '-start_date'
-        )  # subquery for the final queryset
-        actual_versions = self.filter(
-            pk=Subquery(sq.values('pk')[:1])
+    def get_active_on_date_versions(self, date):
+        """
+        Versions which interval [start_date, end_date) contains given date,
+        one for each guide.
+        """
+        return self.get_valid_to_date_versions(date).filter(
+            Q(end_date__isnull=True) | Q(end_date__gt=date)
         )
-        return actual_versions
 
 
 class VersionManager(models.Manager):
     def get_queryset(self):
         return VersionQuerySet(model=self.model, using=self._db)
 
-    def valid_versions(self, date=CURRENT_DATE):
+    def valid_versions(self, date=None):
         """
         All versions with start_date not later than current date or
         given date are considered as valid.
         Output of versions with start_date in future if they are present
         in db will be blocked.
         """
+        if date is None:
+            date = clock.today()
         queryset = self.get_queryset()
         return queryset.get_valid_to_date_versions(date)
 
-    def actual_versions(self, date=CURRENT_DATE):
+    def actual_versions(self, date=None):
         """
         Returns queryset consisting from valid versions to given date
         with last start_date value for each guide.
+        Versions actual for current date are taken from materialized
+        ActualVersion table by join, for other dates or overridden clock -
+        by range lookup on versions' start_date and end_date.
+        """
+        today = clock.today()
+        filter_date = today if date is None else min(today, date)
+        if (filter_date == today) and not clock.is_overridden:
+            actual_version_model = self.model._meta.get_field(
+                'actual_for'
+            ).related_model
+            actual_version_model.objects.rollover_once(today)
+            return self.get_queryset().filter(actual_for__isnull=False)
+
+        queryset = self.get_queryset()
+        return queryset.get_active_on_date_versions(filter_date)
+
+    def version_history(self, guide_id: int):
+        """Returns (start_date, id) of guide's versions in order of action."""
+        return self.get_queryset().filter(
+            guide_id=guide_id
+        ).order_by(
+            'start_date', 'pk'
+        ).values_list(
+            'start_date', 'pk'
+        )
+
+    def resolve_versions(self, versions_keys: Iterable[tuple]) -> dict:
+        """
+        Resolves (guide_id, version_id, date) keys to ids of versions by one
+        query: pointed version if it is valid for guide or version actual
+        on date (current date if date is none) by range lookup on versions'
+        start_date and end_date. Unresolved keys are missing in result.
+        """
+        today = clock.today()
+        versions_keys = set(versions_keys)
+        pointed_ids, dated_guides_ids = set(), {}
+        for guide_id, version_id, date in versions_keys:
+            if version_id is not None:
+                pointed_ids.add(version_id)
+            else:
+                date = today if date is None else min(today, date)
+                dated_guides_ids.setdefault(date, set()).add(guide_id)
+
+        conditions = Q()
+        if pointed_ids:
+            conditions |= Q(pk__in=pointed_ids, start_date__lte=today)
+        for date, guides_ids in dated_guides_ids.items():
+            conditions |= Q(
+                guide_id__in=guides_ids,
+                start_date__lte=date
+            ) & (
+                Q(end_date__isnull=True) | Q(end_date__gt=date)
+            )
+        if not conditions:
+            return {}
+
+        versions = {}
+        guides_versions = {}
+        for version in self.get_queryset().filter(conditions).values_list(
+            'pk', 'guide_id', 'start_date', 'end_date'
+        ):
+            versions[version[0]] = version
+            guides_versions.setdefault(version[1], []).append(version)
+
+        resolved = {}
+        for key in versions_keys:
+            guide_id, version_id, date = key
+            if version_id is not None:
+                version = versions.get(version_id)
+                if (version is not None) and (version[1] == guide_id):
+                    resolved[key] = version_id
+                continue
+
+            date = today if date is None else min(today, date)
+            for pk, _, start_date, end_date in guides_versions.get(guide_id,
+                                                                   []):
+                if start_date <= date and (end_date is None
+                                           or end_date > date):
+                    resolved[key] = pk
+                    break
+        return resolved
+
+    def touch(self, version_ids: Iterable[int]) -> None:
+        """Increments revision of versions which elements were changed."""
+        self.get_queryset().filter(
+            pk__in=version_ids
+        ).update(
+            revision=F('revision') + 1,
+            updated_at=timezone.now()
+        )
+
+    def refresh_end_dates(self, guide_id: int) -> None:
+        """Sets end_date of guide's versions to start_date of next ones."""
+        versions = list(
+            self.get_queryset().filter(
+                guide_id=guide_id
+            ).order_by(
+                'start_date', 'pk'
+            ).values_list(
+                'pk', 'start_date', 'end_date'
+            )
+        )
+        next_start_dates = [start_date for _, start_date, _ in versions[1:]]
+        next_start_dates.append(None)
+        for (version_id, _, end_date), next_start_date in zip(
+                versions, next_start_dates):
+            if end_date != next_start_date:
+                self.get_queryset().filter(
+                    pk=version_id
+                ).update(
+                    end_date=next_start_date
+                )
+
+
+class ActualVersionManager(models.Manager):
+    _rolled_over_date = None
+
+    def _get_version_model(self):
+        return self.model._meta.get_field('version').related_model
+
+    def refresh_for_guides(self, guide_ids: Iterable[int],
+                           date=None) -> None:
+        """
+        Recomputes guides' actual version for given or current date and
+        date when guide's next version becomes actual.
+        """
+        if date is None:
+            date = clock.today()
+        version_model = self._get_version_model()
+        for guide_id in set(guide_ids):
+            guide_versions = version_model.objects.filter(guide_id=guide_id)
+            actual_version = guide_versions.filter(
+                start_date__lte=date
+            ).order_by(
+                '-start_date', '-pk'
+            ).values_list(
+                'pk', 'start_date'
+            ).first()
+            next_start_date = guide_versions.filter(
+                start_date__gt=date
+            ).order_by(
+                'start_date'
+            ).values_list(
+                'start_date', flat=True
+            ).first()
+
+            if (actual_version is None) and (next_start_date is None):
+                self.filter(guide_id=guide_id).delete()
+                continue
+
+            version_id, start_date = actual_version or (None, None)
+            self.update_or_create(
+                guide_id=guide_id,
+                defaults={
+                    'version_id': version_id,
+                    'effective_from': start_date,
+                    'effective_to': next_start_date,
+                }
+            )
+
+    def refresh_all(self, date=None) -> None:
+        version_model = self._get_version_model()
+        guide_ids = version_model.objects.values_list('guide_id', flat=True)
+        self.exclude(guide_id__in=guide_ids).delete()
+        self.refresh_for_guides(guide_ids.distinct(), date=date)
+
+    def rollover(self, date=None) -> None:
+        """Moves guides which next version became actual to this version."""
+        if date is None:
+            date = clock.today()
+        expired_guide_ids = self.filter(
+            effective_to__lte=date
+        ).values_list(
+            'guide_id', flat=True
+        )
+        self.refresh_for_guides(list(expired_guide_ids), date=date)
+
+    def rollover_once(self, date=None) -> None:
+        """Runs rollover once a day per process."""
+        if date is None:
+            date = clock.today()
+        if ActualVersionManager._rolled_over_date != date:
+            self.rollover(date)
+            ActualVersionManager._rolled_over_date = date
+
+
+class ElementInVersionQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        """
+        Fills code and value of objects created without them, for example
+        by version.elements.add(), from their elements and checks their
+        uniqueness in version before insert.
+        """
+        objs = list(objs)
+        unfilled_objs = [obj for obj in objs if not (obj.code or obj.value)]
+        if unfilled_objs:
+            elements = self.model._meta.get_field(
+                'element'
+            ).related_model.objects.in_bulk(
+                {obj.element_id for obj in unfilled_objs}
+            )
+            for obj in unfilled_objs:
+                obj.element = elements[obj.element_id]
+                obj.fill_element_attributes()
+            self.model.objects.validate_batch(unfilled_objs)
+
+        return super().bulk_create(objs, *args, **kwargs)
+
+
+class ElementInVersionManager(models.Manager):
+    def get_queryset(self):
+        return ElementInVersionQuerySet(model=self.model, using=self._db)
+
+    def diff(self, version_id: int, from_version_id: int) -> tuple:
         """
-        filter_date = min(CURRENT_DATE, date)
-        queryset = self.get_queryset().get_valid_to_date_versions(filter_date)
-        return queryset.get_only_actual_versions()
+        Returns (added, removed) querysets of (element_id, code, value) of
+        elements which are in version but not in version from and vice
+        versa. Both are computed in db by EXCEPT.
+        """
+
+        def get_rows(rows_version_id):
+            return self.filter(
+                version_id=rows_version_id
+            ).values_list(
+                'element_id', 'code', 'value'
+            )
+
+        added = get_rows(version_id).difference(
+            get_rows(from_version_id)
+        ).order_by('code')
+        removed = get_rows(from_version_id).difference(
+            get_rows(version_id)
+        ).order_by('code')
+        return added, removed
+
+    def find_elements(self, version_id: int, codes: Iterable[str]) -> set:
+        """Returns (code, value) pairs of version's elements with codes."""
+
+        return set(
+            self.filter(
+                version_id=version_id,
+                code__in=set(codes)
+            ).values_list(
+                'code', 'value'
+            )
+        )
+
+    def validate_batch(self, elements_in_versions: Iterable,
+                       deleted_ids: Iterable[int] = ()) -> None:
+        """
+        Checks uniqueness of code and value inside version for batch of
+        ElementInVersion objects with filled code and value at once:
+        against each other and against db rows by one query.
+        Rows with deleted_ids are not taken into account.
+        """
+
+        errors = []
+        codes, values = set(), set()
+        excluded_ids = set(deleted_ids)
+        for element_in_version in elements_in_versions:
+            code_key = (element_in_version.version_id, element_in_version.code)
+            value_key = (
+                element_in_version.version_id,
+                element_in_version.value
+            )
+            if code_key in codes:
+                errors.append(f'Code {element_in_version.code} is repeated '
+                              f'for the same version')
+            if value_key in values:
+                errors.append(f'Value {element_in_version.value} is repeated '
+                              f'for the same version')
+            codes.add(code_key)
+            values.add(value_key)
+            if element_in_version.pk is not None:
+                excluded_ids.add(element_in_version.pk)
+
+        if not codes:
+            return
+
+        conflicts = self.filter(
+            version_id__in={version_id for version_id, _ in codes}
+        ).filter(
+            Q(code__in={code for _, code in codes})
+            | Q(value__in={value for _, value in values})
+        ).exclude(
+            pk__in=excluded_ids
+        ).values_list(
+            'version_id', 'code', 'value'
+        )
+        for version_id, code, value in conflicts:
+            if (version_id, code) in codes:
+                errors.append(
+                    'You already have element with such code in this version'
+                )
+            elif (version_id, value) in values:
+                errors.append(
+                    'You already have element with such value in this version'
+                )
+
+        if errors:
+            raise ValidationError(errors)
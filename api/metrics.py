@@ -0,0 +1,203 @@
+"""
+In-process request metrics: query count, db, serialization and total time
+of each request, collected by RequestMetricsMiddleware and MetricsMixin
+when GLOSSARY_METRICS setting is on and exposed in Prometheus text format.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Optional
+
+from django.conf import settings
+from rest_framework.response import Response
+
+from api.bloom import bloom_filter_stats
+
+
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25,
+                    0.5, 1.0, 2.5, 5.0, 10.0)
+QUERIES_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+_current_metrics = ContextVar('request_metrics', default=None)
+
+
+def is_enabled() -> bool:
+    return getattr(settings, 'GLOSSARY_METRICS', False)
+
+
+class RequestMetrics:
+    """Timings of one request in seconds, filled while it is processed."""
+
+    def __init__(self):
+        self.view = None
+        self.queries = 0
+        self.db_time = 0.0
+        self.count_time = 0.0  # part of db_time spent in COUNT queries
+        self.serialize_time = 0.0
+        self.started_at = time.perf_counter()
+        self.total_time = None
+
+    def finish(self) -> None:
+        self.total_time = time.perf_counter() - self.started_at
+
+    def as_dict(self) -> dict:
+        return {
+            'view': self.view,
+            'queries': self.queries,
+            'db_ms': round(self.db_time * 1000, 3),
+            'count_ms': round(self.count_time * 1000, 3),
+            'serialize_ms': round(self.serialize_time * 1000, 3),
+            'total_ms': round(self.total_time * 1000, 3),
+        }
+
+    def get_server_timing(self) -> str:
+        return ', '.join((
+            f'db;dur={self.db_time * 1000:.3f};'
+            f'desc="{self.queries} queries"',
+            f'count;dur={self.count_time * 1000:.3f}',
+            f'serialize;dur={self.serialize_time * 1000:.3f}',
+            f'total;dur={self.total_time * 1000:.3f}',
+        ))
+
+
+def start_request_metrics() -> tuple:
+    """Returns metrics of new request and token to reset them."""
+
+    metrics = RequestMetrics()
+    return metrics, _current_metrics.set(metrics)
+
+
+def finish_request_metrics(token) -> None:
+    _current_metrics.reset(token)
+
+
+def get_request_metrics() -> Optional[RequestMetrics]:
+    return _current_metrics.get()
+
+
+def record_query(execute, sql, params, many, context):
+    """Execute wrapper of db connections measuring queries of request."""
+
+    metrics = _current_metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+
+    started_at = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - started_at
+        metrics.queries += 1
+        metrics.db_time += elapsed
+        if sql.startswith('SELECT COUNT('):
+            metrics.count_time += elapsed
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    """Adds record_query to wrappers of every new db connection."""
+
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class MetricsMixin:
+    """
+    Names request metrics by viewset action and renders response in view
+    to measure serialization time. Does nothing if metrics are disabled.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        metrics = get_request_metrics()
+        if metrics is not None:
+            metrics.view = f'{self.basename}.{self.action or "unknown"}'
+        super().initial(request, *args, **kwargs)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response,
+                                             *args, **kwargs)
+        metrics = get_request_metrics()
+        if (metrics is not None) and isinstance(response, Response):
+            started_at = time.perf_counter()
+            response.render()
+            metrics.serialize_time += time.perf_counter() - started_at
+        return response
+
+
+class Histogram:
+    """Prometheus histogram with cumulative buckets per labels."""
+
+    def __init__(self, name: str, documentation: str, buckets: tuple):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = buckets
+        self._series = {}  # labels: [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, labels: tuple, value: float) -> None:
+        position = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 2)
+            series[position] += 1
+            series[-1] += value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+    def render(self, label_names: tuple) -> list:
+        lines = [f'# HELP {self.name} {self.documentation}',
+                 f'# TYPE {self.name} histogram']
+        with self._lock:
+            series_items = [(labels, list(series))
+                            for labels, series in self._series.items()]
+
+        for labels, series in sorted(series_items):
+            label_pairs = [
+                f'{name}="{value}"' for name, value in zip(label_names,
+                                                           labels)
+            ]
+            cumulative = 0
+            for bound, count in zip((*self.buckets, '+Inf'), series[:-1]):
+                cumulative += count
+                bucket_labels = ','.join((*label_pairs, f'le="{bound}"'))
+                lines.append(f'{self.name}_bucket{{{bucket_labels}}} '
+                             f'{cumulative}')
+            series_labels = ','.join(label_pairs)
+            lines.append(f'{self.name}_sum{{{series_labels}}} {series[-1]}')
+            lines.append(f'{self.name}_count{{{series_labels}}} '
+                         f'{cumulative}')
+        return lines
+
+
+LABEL_NAMES = ('view', 'method')
+
+HISTOGRAMS = {
+    'total': Histogram('glossary_request_duration_seconds',
+                       'Time of request processing.', DURATION_BUCKETS),
+    'db': Histogram('glossary_request_db_duration_seconds',
+                    'Time of db queries of request.', DURATION_BUCKETS),
+    'serialize': Histogram('glossary_request_serialize_duration_seconds',
+                           'Time of response data rendering.',
+                           DURATION_BUCKETS),
+    'queries': Histogram('glossary_request_queries',
+                         'Number of db queries of request.', QUERIES_BUCKETS),
+}
+
+
+def observe_request(metrics: RequestMetrics, method: str) -> None:
+    labels = (metrics.view or 'unknown', method)
+    HISTOGRAMS['total'].observe(labels, metrics.total_time)
+    HISTOGRAMS['db'].observe(labels, metrics.db_time)
+    HISTOGRAMS['serialize'].observe(labels, metrics.serialize_time)
+    HISTOGRAMS['queries'].observe(labels, metrics.queries)
+
+
+def render_prometheus() -> str:
+    lines = []
+    for histogram in HISTOGRAMS.values():
+        lines.extend(histogram.render(LABEL_NAMES))
+    lines.extend(bloom_filter_stats.render())
+    return '\n'.join(lines) + '\n'
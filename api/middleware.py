@@ -0,0 +1,64 @@
+import json
+import logging
+
+from django.core.exceptions import MiddlewareNotUsed
+
+from api.metrics import (finish_request_metrics, is_enabled,
+                         observe_request, start_request_metrics)
+from api.routers import (PRIMARY_COOKIE, get_replicas, get_replication_lag,
+                         is_write_request)
+
+
+logger = logging.getLogger('api.metrics')
+
+
+class RequestMetricsMiddleware:
+    """
+    Records query count, db, serialization and total time of request,
+    sends them in Server-Timing header and log and aggregates them into
+    histograms. Removed from middleware chain if GLOSSARY_METRICS is off.
+    """
+
+    def __init__(self, get_response):
+        if not is_enabled():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics, token = start_request_metrics()
+        try:
+            response = self.get_response(request)
+        finally:
+            finish_request_metrics(token)
+
+        metrics.finish()
+        if (metrics.view is None) and (request.resolver_match is not None):
+            metrics.view = request.resolver_match.view_name
+        response['Server-Timing'] = metrics.get_server_timing()
+        observe_request(metrics, request.method)
+        logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            **metrics.as_dict(),
+        }))
+        return response
+
+
+class ReadYourWritesMiddleware:
+    """
+    After write request, i.e. admin changes, marks client by cookie, so its
+    reads go to primary database until replicas catch up. POST requests of
+    read only API views do not mark client.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if get_replicas() and is_write_request(request):
+            response.set_cookie(PRIMARY_COOKIE, '1',
+                                max_age=get_replication_lag(),
+                                httponly=True)
+        return response
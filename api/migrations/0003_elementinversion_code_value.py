@@ -0,0 +1,37 @@
+# Generated by Django 2.2.19 on 2026-10-18 10:12
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def fill_code_value(apps, schema_editor):
+    Element = apps.get_model('api', 'Element')
+    ElementInVersion = apps.get_model('api', 'ElementInVersion')
+    element = Element.objects.filter(pk=OuterRef('element_id'))
+    ElementInVersion.objects.update(
+        code=Subquery(element.values('code')[:1]),
+        value=Subquery(element.values('value')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_auto_20210911_1945'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='elementinversion',
+            name='code',
+            field=models.CharField(default='', editable=False, max_length=50, verbose_name='код'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='elementinversion',
+            name='value',
+            field=models.CharField(default='', editable=False, max_length=100, verbose_name='значение'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_code_value, migrations.RunPython.noop),
+    ]
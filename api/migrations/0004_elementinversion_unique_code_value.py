@@ -0,0 +1,21 @@
+# Generated by Django 2.2.19 on 2026-10-18 10:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_elementinversion_code_value'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='elementinversion',
+            constraint=models.UniqueConstraint(fields=('version', 'code'), name='unique_version_code'),
+        ),
+        migrations.AddConstraint(
+            model_name='elementinversion',
+            constraint=models.UniqueConstraint(fields=('version', 'value'), name='unique_version_value'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 2.2.19 on 2026-10-18 11:40
+
+import datetime as dt
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_actual_versions(apps, schema_editor):
+    Version = apps.get_model('api', 'Version')
+    ActualVersion = apps.get_model('api', 'ActualVersion')
+    today = dt.date.today()
+    actual_versions = []
+    for guide_id in Version.objects.values_list(
+            'guide_id', flat=True).distinct():
+        guide_versions = Version.objects.filter(guide_id=guide_id)
+        actual_version = guide_versions.filter(
+            start_date__lte=today).order_by('-start_date').first()
+        next_version = guide_versions.filter(
+            start_date__gt=today).order_by('start_date').first()
+        actual_versions.append(ActualVersion(
+            guide_id=guide_id,
+            version=actual_version,
+            effective_from=getattr(actual_version, 'start_date', None),
+            effective_to=getattr(next_version, 'start_date', None),
+        ))
+    ActualVersion.objects.bulk_create(actual_versions)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_elementinversion_unique_code_value'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActualVersion',
+            fields=[
+                ('guide', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='actual_version', serialize=False, to='api.Guide', verbose_name='справочник')),
+                ('effective_from', models.DateField(null=True, verbose_name='действует с')),
+                ('effective_to', models.DateField(db_index=True, null=True, verbose_name='действует до')),
+                ('version', models.OneToOneField(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='actual_for', to='api.Version', verbose_name='актуальная версия')),
+            ],
+            options={
+                'verbose_name': 'актуальная версия',
+                'verbose_name_plural': 'актуальные версии',
+            },
+        ),
+        migrations.RunPython(fill_actual_versions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 2.2.19 on 2026-10-18 12:25
+
+from django.db import migrations, models
+
+
+def fill_end_dates(apps, schema_editor):
+    Version = apps.get_model('api', 'Version')
+    next_versions = {}
+    for version in Version.objects.order_by('-start_date', '-pk'):
+        version.end_date = next_versions.get(version.guide_id)
+        next_versions[version.guide_id] = version.start_date
+        version.save(update_fields=['end_date'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_actualversion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='version',
+            name='end_date',
+            field=models.DateField(blank=True, editable=False, null=True, verbose_name='дата окончания действия'),
+        ),
+        migrations.AddIndex(
+            model_name='version',
+            index=models.Index(fields=['guide', 'start_date'], name='version_guide_start_date_idx'),
+        ),
+        migrations.RunPython(fill_end_dates, migrations.RunPython.noop),
+    ]
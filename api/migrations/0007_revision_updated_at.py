@@ -0,0 +1,31 @@
+# Generated by Django 2.2.19 on 2026-10-18 13:02
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_version_end_date'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='guide',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, verbose_name='дата изменения'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='version',
+            name='revision',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='ревизия элементов'),
+        ),
+        migrations.AddField(
+            model_name='version',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, verbose_name='дата изменения'),
+            preserve_default=False,
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 2.2.19 on 2026-10-18 15:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_revision_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='elementinversion',
+            index=models.Index(fields=['version', 'element'], name='eiv_version_element_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='elementinversion',
+            index=models.Index(fields=['version', 'code', 'value'], name='eiv_version_code_value_idx'),
+        ),
+    ]
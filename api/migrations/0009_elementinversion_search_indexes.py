@@ -0,0 +1,95 @@
+# Generated by Django 2.2.19 on 2026-10-18 16:40
+
+from django.db import migrations
+
+
+POSTGRESQL_SEARCH_INDEXES = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    'CREATE INDEX eiv_version_code_like_idx ON api_elementinversion '
+    '(version_id, code varchar_pattern_ops)',
+    'CREATE INDEX eiv_value_trgm_idx ON api_elementinversion '
+    'USING gin (UPPER(value) gin_trgm_ops)',
+]
+POSTGRESQL_DROP_SEARCH_INDEXES = [
+    'DROP INDEX IF EXISTS eiv_value_trgm_idx',
+    'DROP INDEX IF EXISTS eiv_version_code_like_idx',
+]
+
+# External content FTS5 table kept in sync by triggers. SQLite recreates
+# api_elementinversion on altering its fields and drops triggers, they are
+# recreated after migrations by api.search.ensure_sqlite_fts_triggers.
+SQLITE_SEARCH_INDEXES = [
+    "CREATE VIRTUAL TABLE api_elementinversion_fts USING fts5("
+    "value, content='api_elementinversion', content_rowid='id', "
+    "tokenize='trigram')",
+    'CREATE TRIGGER api_elementinversion_fts_insert '
+    'AFTER INSERT ON api_elementinversion BEGIN '
+    'INSERT INTO api_elementinversion_fts(rowid, value) '
+    'VALUES (new.id, new.value); END',
+    'CREATE TRIGGER api_elementinversion_fts_delete '
+    'AFTER DELETE ON api_elementinversion BEGIN '
+    'INSERT INTO api_elementinversion_fts(api_elementinversion_fts, rowid, '
+    "value) VALUES ('delete', old.id, old.value); END",
+    'CREATE TRIGGER api_elementinversion_fts_update '
+    'AFTER UPDATE OF value ON api_elementinversion BEGIN '
+    'INSERT INTO api_elementinversion_fts(api_elementinversion_fts, rowid, '
+    "value) VALUES ('delete', old.id, old.value); "
+    'INSERT INTO api_elementinversion_fts(rowid, value) '
+    'VALUES (new.id, new.value); END',
+    'INSERT INTO api_elementinversion_fts(api_elementinversion_fts) '
+    "VALUES ('rebuild')",
+]
+SQLITE_DROP_SEARCH_INDEXES = [
+    'DROP TRIGGER IF EXISTS api_elementinversion_fts_update',
+    'DROP TRIGGER IF EXISTS api_elementinversion_fts_delete',
+    'DROP TRIGGER IF EXISTS api_elementinversion_fts_insert',
+    'DROP TABLE IF EXISTS api_elementinversion_fts',
+]
+
+
+def _has_sqlite_fts5_trigram(connection) -> bool:
+    """Trigram tokenizer is available since SQLite 3.34 with FTS5."""
+
+    with connection.cursor() as cursor:
+        try:
+            cursor.execute("CREATE VIRTUAL TABLE temp.fts5_check USING "
+                           "fts5(value, tokenize='trigram')")
+        except Exception:
+            return False
+        cursor.execute('DROP TABLE temp.fts5_check')
+    return True
+
+
+def create_search_indexes(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'postgresql':
+        statements = POSTGRESQL_SEARCH_INDEXES
+    elif (connection.vendor == 'sqlite'
+            and _has_sqlite_fts5_trigram(connection)):
+        statements = SQLITE_SEARCH_INDEXES
+    else:
+        return
+
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def drop_search_indexes(apps, schema_editor):
+    vendor_statements = {
+        'postgresql': POSTGRESQL_DROP_SEARCH_INDEXES,
+        'sqlite': SQLITE_DROP_SEARCH_INDEXES,
+    }
+    for statement in vendor_statements.get(schema_editor.connection.vendor,
+                                           []):
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_elementinversion_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.19 on 2026-10-18 14:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_elementinversion_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='element',
+            name='value',
+            field=models.CharField(db_index=True, max_length=100, verbose_name='значение'),
+        ),
+    ]
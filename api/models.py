@@ -1,17 +1,13 @@
-import datetime as dt
-
 from django.core.exceptions import ValidationError
 from django.db import models
 
-from api.managers import VersionManager
-
-
-CURRENT_DATE = dt.date.today()
+from api.managers import (ActualVersionManager, ElementInVersionManager,
+                          VersionManager)
 
 
 class Element(models.Model):
     code = models.CharField('код', max_length=50, db_index=True)
-    value = models.CharField('значение', max_length=100)
+    value = models.CharField('значение', max_length=100, db_index=True)
 
     class Meta:
         verbose_name = 'элемент'
@@ -27,6 +23,34 @@ class Element(models.Model):
     def __str__(self):
         return self.code
 
+    def validate_unique(self, exclude=None):
+        super().validate_unique(exclude=exclude)
+        if self.pk is None:
+            return
+
+        conflicts_in_versions = ElementInVersion.objects.filter(
+            version__version_elements__element_id=self.pk
+        ).exclude(
+            element_id=self.pk
+        ).filter(
+            models.Q(code=self.code) | models.Q(value=self.value)
+        )
+        if conflicts_in_versions.exists():
+            raise ValidationError(
+                'Element with such code or value is already in versions '
+                'with this element'
+            )
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self.elementinversion_set.exclude(
+            code=self.code,
+            value=self.value
+        ).update(
+            code=self.code,
+            value=self.value
+        )
+
 
 class Guide(models.Model):
     title = models.CharField('наименование', max_length=100, unique=True)
@@ -41,6 +65,7 @@ class Guide(models.Model):
         null=True,
         blank=True
     )
+    updated_at = models.DateTimeField('дата изменения', auto_now=True)
 
     class Meta:
         verbose_name = 'Справочник'
@@ -50,17 +75,13 @@ class Guide(models.Model):
     def __str__(self):
         return self.title
 
-    def get_actual_version(self, date=CURRENT_DATE):
+    def get_actual_version(self, date=None):
         """Returns guide's version actual for exact date or current date."""
-        try:
-            actual_version = self.versions.filter(
-                start_date__lte=date
-            ).order_by(
-                'start_date'
-            ).last()
-            return actual_version
-        except Version.DoesNotExist:
-            return
+        return Version.objects.actual_versions(
+            date=date
+        ).filter(
+            guide=self
+        ).first()
 
 
 class Version(models.Model):
@@ -75,6 +96,18 @@ class Version(models.Model):
         null=False,
         blank=False
     )
+    end_date = models.DateField(
+        'дата окончания действия',
+        null=True,
+        blank=True,
+        editable=False
+    )
+    revision = models.PositiveIntegerField(
+        'ревизия элементов',
+        default=0,
+        editable=False
+    )
+    updated_at = models.DateTimeField('дата изменения', auto_now=True)
     elements = models.ManyToManyField(
         Element,
         through='ElementInVersion',
@@ -92,11 +125,49 @@ class Version(models.Model):
                 name='unique_guide_version'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['guide', 'start_date'],
+                name='version_guide_start_date_idx'
+            ),
+        ]
 
     def __str__(self):
         return f'{self.guide.short_title} версия {self.name}'
 
 
+class ActualVersion(models.Model):
+    """
+    Materialized guide's version actual for current date.
+    Kept by signals on Version changes and rolled over daily to the next
+    version of guide at effective_to date.
+    """
+    guide = models.OneToOneField(
+        Guide,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='actual_version',
+        verbose_name='справочник'
+    )
+    version = models.OneToOneField(
+        Version,
+        on_delete=models.CASCADE,
+        null=True,
+        related_name='actual_for',
+        verbose_name='актуальная версия'
+    )
+    effective_from = models.DateField('действует с', null=True)
+    effective_to = models.DateField('действует до', null=True, db_index=True)
+    objects = ActualVersionManager()
+
+    class Meta:
+        verbose_name = 'актуальная версия'
+        verbose_name_plural = 'актуальные версии'
+
+    def __str__(self):
+        return f'{self.guide_id}: {self.version_id}'
+
+
 class ElementInVersion(models.Model):
     version = models.ForeignKey(
         Version,
@@ -109,30 +180,49 @@ class ElementInVersion(models.Model):
         on_delete=models.CASCADE,
         verbose_name='элемент'
     )
+    code = models.CharField('код', max_length=50, editable=False)
+    value = models.CharField('значение', max_length=100, editable=False)
+    objects = ElementInVersionManager()
 
-    def validate_unique(self, exclude=None):
-        elems_with_code = Element.objects.filter(code=self.element.code)
-        elems_in_version = ElementInVersion.objects.filter(
-            version=self.version
-        ).exclude(
-            id=self.id
-        )
+    def fill_element_attributes(self):
+        """Copies element's code and value used for uniqueness in version."""
 
-        if elems_in_version.filter(element__in=elems_with_code).exists():
-            raise ValidationError(
-                'You already have element with such code in this version'
-            )
+        self.code = self.element.code
+        self.value = self.element.value
 
-        elems_with_value = Element.objects.filter(value=self.element.value)
-        if elems_in_version.filter(element__in=elems_with_value).exists():
-            raise ValidationError(
-                'You already have element with such value in this version'
-            )
+    def validate_unique(self, exclude=None):
+        if (self.version_id is None) or (self.element_id is None):
+            return
+
+        self.fill_element_attributes()
+        ElementInVersion.objects.validate_batch([self])
 
     def save(self, *args, **kwargs):
         self.validate_unique()
-        super().save(self, *args, **kwargs)
+        super().save(*args, **kwargs)
 
     class Meta:
         verbose_name = 'элемент в версии справочника'
         verbose_name_plural = 'элементы в версии справочника'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['version', 'code'],
+                name='unique_version_code'
+            ),
+            models.UniqueConstraint(
+                fields=['version', 'value'],
+                name='unique_version_value'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['version', 'element'],
+                name='eiv_version_element_idx'
+            ),
+            # Covers (code, value) lookups of version's elements, so they
+            # are answered from index only.
+            models.Index(
+                fields=['version', 'code', 'value'],
+                name='eiv_version_code_value_idx'
+            ),
+        ]
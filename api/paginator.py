@@ -1,7 +1,55 @@
-from rest_framework.pagination import PageNumberPagination
+from collections import OrderedDict
+
+from django.core.paginator import Paginator
+from django.utils.functional import cached_property
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.response import Response
 
 
 class CustomPagination(PageNumberPagination):
     page_size = 10
     page_size_query_param = 'limit'
     max_page_size = 50
+
+
+class ElementCursorPagination(CursorPagination):
+    """
+    Keyset pagination for version's elements by (code, element_id), codes
+    are unique inside version so page cost does not depend on its depth.
+    Total count is computed unless skip_count parameter is passed.
+    """
+    page_size = 10
+    page_size_query_param = 'limit'
+    max_page_size = 1000
+    ordering = ('code', 'element_id')
+    skip_count_query_param = 'skip_count'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count = None
+        skip_count = request.query_params.get(self.skip_count_query_param)
+        if skip_count not in ('1', 'true'):
+            self.count = queryset.count()
+
+        return super().paginate_queryset(queryset, request, view=view)
+
+    def get_paginated_response(self, data):
+        response_data = OrderedDict()
+        if self.count is not None:
+            response_data['count'] = self.count
+        response_data['next'] = self.get_next_link()
+        response_data['previous'] = self.get_previous_link()
+        response_data['results'] = data
+        return Response(response_data)
+
+
+class LimitedCountPaginator(Paginator):
+    """
+    Admin changelist paginator counting at most max_count objects, so
+    COUNT over large filtered table reads no more than max_count rows.
+    Pages beyond max_count are reached by narrowing search.
+    """
+    max_count = 10000
+
+    @cached_property
+    def count(self):
+        return self.object_list[:self.max_count].count()
@@ -0,0 +1,135 @@
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Iterable, Iterator
+
+from django.conf import settings
+from rest_framework.permissions import SAFE_METHODS
+
+from api.cache import LAST_WRITE_KEY, get_cache
+
+
+PRIMARY_COOKIE = 'glossary_primary'
+# Request attribute marking unsafe request of read only view.
+READ_ONLY_ATTR = 'glossary_read_only'
+
+_replica_reads = ContextVar('replica_reads', default=False)
+
+
+def get_replicas() -> list:
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+def get_replication_lag() -> int:
+    return getattr(settings, 'DATABASE_REPLICATION_LAG', 5)
+
+
+@contextmanager
+def replica_reads(enabled: bool = True):
+    """Routes reads made in the block to replicas."""
+
+    token = _replica_reads.set(enabled)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+@contextmanager
+def request_reads(request, read_only: bool = False):
+    """
+    Routes reads of request to replicas when they are up to date, unsafe
+    requests of read only views are routed as safe ones.
+    """
+
+    if read_only:
+        setattr(request, READ_ONLY_ATTR, True)
+    with replica_reads(can_read_from_replica(request)):
+        yield
+
+
+def read_only_view(view):
+    """Decorates function view taking POST body which writes nothing."""
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        with request_reads(request, read_only=True):
+            return view(request, *args, **kwargs)
+
+    return wrapper
+
+
+def iter_in_current_reads(iterable: Iterable) -> Iterator:
+    """
+    Iterates over iterable with reads routed as in current block, used for
+    streamed responses which are consumed after view has returned.
+    """
+
+    enabled = _replica_reads.get()
+
+    def iterate():
+        iterator = iter(iterable)
+        while True:
+            with replica_reads(enabled):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    return iterate()
+
+
+def is_write_request(request) -> bool:
+    """
+    Unsafe requests are writes unless their view is read only, like
+    validation endpoints taking elements in POST body.
+    """
+
+    return ((request.method not in SAFE_METHODS)
+            and not getattr(request, READ_ONLY_ATTR, False))
+
+
+def can_read_from_replica(request) -> bool:
+    """
+    Replicas are used for reads only if nothing was written during
+    replication lag: neither by this client (cookie set after write) nor by
+    anyone else (time of last write kept in cache).
+    """
+
+    if not get_replicas() or is_write_request(request):
+        return False
+
+    if PRIMARY_COOKIE in request.COOKIES:
+        return False
+
+    last_write_time = get_cache().get(LAST_WRITE_KEY, 0)
+    return time.time() - last_write_time >= get_replication_lag()
+
+
+class ReplicaRouter:
+    """
+    Sends reads made inside replica_reads() block to random replica from
+    DATABASE_REPLICAS. Everything else, including admin and all writes,
+    goes to default database, which is the only one migrated.
+    """
+
+    def db_for_read(self, model, **hints):
+        replicas = get_replicas()
+        if replicas and _replica_reads.get():
+            return random.choice(replicas)
+        return None
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {'default', *get_replicas()}
+        if {obj1._state.db, obj2._state.db} <= databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in get_replicas()
@@ -0,0 +1,176 @@
+from typing import Optional
+
+from django.db import connections
+from django.db.models import (Case, CharField, Func, IntegerField, Q, Value,
+                              When)
+
+from api.db import SQLITE_UPPER_FUNCTION
+from api.models import ElementInVersion
+
+
+# FTS5 table over ElementInVersion.value with trigram tokenizer created by
+# migration 0009 on SQLite, it finds substrings of at least 3 characters.
+SQLITE_FTS_TABLE = 'api_elementinversion_fts'
+SQLITE_FTS_MIN_LENGTH = 3
+# Largest code point, strings with prefix sort before prefix + MAX_CHAR.
+MAX_CHAR = chr(0x10FFFF)
+
+# Triggers keeping FTS table in sync, they are dropped when SQLite remakes
+# api_elementinversion on altering its fields and are recreated after
+# migrations by ensure_sqlite_fts_triggers.
+SQLITE_FTS_TRIGGERS = {
+    'api_elementinversion_fts_insert':
+        'CREATE TRIGGER api_elementinversion_fts_insert '
+        'AFTER INSERT ON api_elementinversion BEGIN '
+        'INSERT INTO api_elementinversion_fts(rowid, value) '
+        'VALUES (new.id, new.value); END',
+    'api_elementinversion_fts_delete':
+        'CREATE TRIGGER api_elementinversion_fts_delete '
+        'AFTER DELETE ON api_elementinversion BEGIN '
+        'INSERT INTO api_elementinversion_fts(api_elementinversion_fts, '
+        "rowid, value) VALUES ('delete', old.id, old.value); END",
+    'api_elementinversion_fts_update':
+        'CREATE TRIGGER api_elementinversion_fts_update '
+        'AFTER UPDATE OF value ON api_elementinversion BEGIN '
+        'INSERT INTO api_elementinversion_fts(api_elementinversion_fts, '
+        "rowid, value) VALUES ('delete', old.id, old.value); "
+        'INSERT INTO api_elementinversion_fts(rowid, value) '
+        'VALUES (new.id, new.value); END',
+}
+
+_sqlite_fts_tables = {}  # db alias: whether FTS table exists
+
+
+class UnicodeUpper(Func):
+    """UPPER which uppercases non-ASCII letters on SQLite as well."""
+
+    function = 'UPPER'
+    output_field = CharField()
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return super().as_sql(compiler, connection,
+                              function=SQLITE_UPPER_FUNCTION,
+                              **extra_context)
+
+
+def _has_sqlite_fts_table(connection) -> bool:
+    if connection.alias not in _sqlite_fts_tables:
+        _sqlite_fts_tables[connection.alias] = (
+            SQLITE_FTS_TABLE in connection.introspection.table_names()
+        )
+    return _sqlite_fts_tables[connection.alias]
+
+
+def ensure_sqlite_fts_triggers(using='default', **kwargs):
+    """
+    Recreates missing triggers of FTS table and rebuilds it, connected to
+    post_migrate signal.
+    """
+
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+
+    _sqlite_fts_tables.pop(using, None)
+    if not _has_sqlite_fts_table(connection):
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger'"
+        )
+        existing_triggers = {row[0] for row in cursor.fetchall()}
+        missing_triggers = [
+            statement for name, statement in SQLITE_FTS_TRIGGERS.items()
+            if name not in existing_triggers
+        ]
+        if not missing_triggers:
+            return
+
+        for statement in missing_triggers:
+            cursor.execute(statement)
+        cursor.execute(f'INSERT INTO {SQLITE_FTS_TABLE}({SQLITE_FTS_TABLE}) '
+                       f"VALUES ('rebuild')")
+
+
+def get_prefix_condition(connection, field: str, prefix: str) -> Q:
+    """
+    Returns case sensitive condition on field prefix which uses index on
+    field: LIKE on PostgreSQL with pattern ops index, range on binary
+    collated field on SQLite, where LIKE is case insensitive and skips
+    index.
+    """
+
+    if connection.vendor == 'sqlite':
+        return Q(**{f'{field}__gte': prefix,
+                    f'{field}__lt': prefix + MAX_CHAR})
+    return Q(**{f'{field}__startswith': prefix})
+
+
+def _filter_value_substring(queryset, connection, value: str):
+    """
+    Filters by case insensitive value substring: by FTS5 trigram index on
+    SQLite, trigram GIN index on UPPER(value) on PostgreSQL serves LIKE on
+    uppercased value. Queryset should be annotated with value_upper.
+    """
+
+    if ((connection.vendor == 'sqlite')
+            and (len(value) >= SQLITE_FTS_MIN_LENGTH)
+            and _has_sqlite_fts_table(connection)):
+        # RawSQL in pk__in lookup is parenthesized twice and turns into
+        # scalar subquery, so condition is added as where clause.
+        phrase = '"{}"'.format(value.replace('"', '""'))
+        table = queryset.model._meta.db_table
+        return queryset.extra(
+            where=[f'"{table}"."id" IN (SELECT rowid '
+                   f'FROM {SQLITE_FTS_TABLE} '
+                   f'WHERE {SQLITE_FTS_TABLE} MATCH %s)'],
+            params=[phrase]
+        )
+    return queryset.filter(value_upper__contains=value.upper())
+
+
+def search_version_elements(version_id: int, code: Optional[str] = None,
+                            value: Optional[str] = None):
+    """
+    Returns (element_id, code, value) rows of version's elements with code
+    starting with code and value containing value. Rows are ranked: exact
+    code, then exact value, value prefix and other matches, by code inside
+    rank.
+    """
+
+    queryset = ElementInVersion.objects.filter(version_id=version_id)
+    connection = connections[queryset.db]
+    ranks = []
+
+    if code:
+        queryset = queryset.filter(
+            get_prefix_condition(connection, 'code', code)
+        )
+        ranks.append(Case(
+            When(code=code, then=Value(0)),
+            default=Value(1),
+            output_field=IntegerField()
+        ))
+
+    if value:
+        queryset = _filter_value_substring(
+            queryset.annotate(value_upper=UnicodeUpper('value')),
+            connection,
+            value
+        )
+        ranks.append(Case(
+            When(value_upper=value.upper(), then=Value(0)),
+            When(value_upper__startswith=value.upper(), then=Value(1)),
+            default=Value(2),
+            output_field=IntegerField()
+        ))
+
+    rank_fields = [f'rank_{number}' for number in range(len(ranks))]
+    return queryset.annotate(
+        **dict(zip(rank_fields, ranks))
+    ).order_by(
+        *rank_fields, 'code'
+    ).values_list(
+        'element_id', 'code', 'value'
+    )
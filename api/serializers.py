@@ -38,3 +38,62 @@ class ElementSerializer(ModelSerializer):
     def get_guide_id(self, obj):
         guide_id = self.context.get('guide_id')
         return guide_id
+
+
+class FastElementSerializer:
+    """
+    Read-only serializer building ElementSerializer's output from
+    (id, code, value) tuples with guide_id injected once.
+    """
+    values_fields = ('element_id', 'code', 'value')
+
+    def __init__(self, rows, guide_id):
+        self._rows = rows
+        self._guide_id = guide_id
+
+    @property
+    def data(self) -> list:
+        guide_id = self._guide_id
+        return [
+            {'id': element_id, 'code': code, 'value': value,
+             'guide_id': guide_id}
+            for element_id, code, value in self._rows
+        ]
+
+
+class FastGuideSerializer:
+    """
+    Read-only serializer building GuideSerializer's output from
+    values_list() tuples of actual versions joined with their guides.
+    """
+    values_fields = ('guide__title', 'guide_id', 'guide__short_title',
+                     'guide__description', 'name', 'start_date')
+
+    def __init__(self, rows):
+        self._rows = rows
+
+    @property
+    def data(self) -> list:
+        return [
+            {'title': title, 'id': guide_id, 'short_title': short_title,
+             'description': description, 'version': name,
+             'start_date': start_date.isoformat()}
+            for (title, guide_id, short_title, description, name,
+                 start_date) in self._rows
+        ]
+
+
+class FastVersionSerializer:
+    """Read-only serializer building VersionSerializer's output."""
+    values_fields = ('id', 'name', 'start_date')
+
+    def __init__(self, rows):
+        self._rows = rows
+
+    @property
+    def data(self) -> list:
+        return [
+            {'id': version_id, 'name': name,
+             'start_date': start_date.isoformat()}
+            for version_id, name, start_date in self._rows
+        ]
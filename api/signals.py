@@ -0,0 +1,112 @@
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_save)
+from django.dispatch import receiver
+
+from api.cache import bump_revisions
+from api.models import (ActualVersion, Element, ElementInVersion, Guide,
+                        Version)
+from api.validation_index import validation_index
+
+
+def _get_changed_guide_ids(version) -> set:
+    previous_guide_id = getattr(version, '_previous_guide_id', None)
+    guide_ids = {version.guide_id, previous_guide_id}
+    guide_ids.discard(None)
+    return guide_ids
+
+
+@receiver(pre_save, sender=Version)
+def remember_previous_guide(sender, instance, **kwargs):
+    if instance.pk is None:
+        return
+
+    instance._previous_guide_id = Version.objects.filter(
+        pk=instance.pk
+    ).values_list(
+        'guide_id', flat=True
+    ).first()
+
+
+@receiver(post_save, sender=Version)
+@receiver(post_delete, sender=Version)
+def refresh_guide_versions(sender, instance, **kwargs):
+    guide_ids = _get_changed_guide_ids(instance)
+    for guide_id in guide_ids:
+        Version.objects.refresh_end_dates(guide_id)
+    ActualVersion.objects.refresh_for_guides(guide_ids)
+
+    validation_index.invalidate_version(instance.pk)
+    for guide_id in guide_ids:
+        validation_index.invalidate_guide(guide_id)
+    bump_revisions(guide_ids, all_guides=True)
+
+
+@receiver(post_save, sender=Guide)
+@receiver(post_delete, sender=Guide)
+def invalidate_guide(sender, instance, **kwargs):
+    bump_revisions([instance.pk], all_guides=True)
+
+
+def on_version_elements_changed(versions_ids) -> None:
+    """
+    Updates versions' revisions and drops their elements from validation
+    index and cached responses. Should be called after bulk operations
+    which do not send model signals.
+    """
+    versions_ids = list(versions_ids)
+    if not versions_ids:
+        return
+
+    Version.objects.touch(versions_ids)
+    for version_id in versions_ids:
+        validation_index.invalidate_version_elements(version_id)
+    bump_revisions(
+        Version.objects.filter(
+            pk__in=versions_ids
+        ).values_list(
+            'guide_id', flat=True
+        ).distinct()
+    )
+
+
+@receiver(post_save, sender=Element)
+@receiver(post_delete, sender=Element)
+def invalidate_element(sender, instance, **kwargs):
+    versions_ids = ElementInVersion.objects.filter(
+        element_id=instance.pk
+    ).values_list(
+        'version_id', flat=True
+    )
+    on_version_elements_changed(versions_ids)
+
+
+@receiver(post_save, sender=ElementInVersion)
+@receiver(post_delete, sender=ElementInVersion)
+def invalidate_element_in_version(sender, instance, **kwargs):
+    on_version_elements_changed([instance.version_id])
+
+
+@receiver(m2m_changed, sender=Version.elements.through)
+def invalidate_version_elements(sender, instance, action, reverse, pk_set,
+                                **kwargs):
+    if reverse and action == 'pre_clear':
+        instance._cleared_versions_ids = list(
+            ElementInVersion.objects.filter(
+                element_id=instance.pk
+            ).values_list(
+                'version_id', flat=True
+            )
+        )
+        return
+
+    if not action.startswith('post_'):
+        return
+
+    if not reverse:
+        on_version_elements_changed([instance.pk])
+    elif pk_set is None:
+        on_version_elements_changed(
+            getattr(instance, '_cleared_versions_ids', [])
+        )
+    else:
+        on_version_elements_changed(pk_set)
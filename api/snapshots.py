@@ -0,0 +1,231 @@
+"""
+Memory-mapped snapshots of published versions' elements.
+Snapshot file is shared by all processes through page cache, so workers
+do not keep own copies of versions' elements. File is written for version
+revision and is not used after elements of version are changed until it
+is published again.
+
+File layout (native byte order), sections are aligned to 8 bytes:
+    header: magic, version id, revision, elements count n, strings count m
+    element ids: n int64 in order of codes in db
+    code refs, value refs: n uint32 each, indexes in strings table
+    code order: n uint32 positions of elements sorted by code code points
+    string offsets: m + 1 uint64 offsets of strings in blob
+    blob: utf-8 encoded interned codes and values
+"""
+import contextlib
+import glob
+import mmap
+import os
+import struct
+import sys
+import threading
+from array import array
+from typing import Iterator, Optional
+
+from django.conf import settings
+
+from api.models import ElementInVersion, Version
+
+
+MAGIC = f'GLSNAP1{sys.byteorder[0]}'.encode()
+HEADER = struct.Struct('=8sqqII')
+FILE_NAME = 'version_{}_r{}.snap'
+
+
+def _align(offset: int) -> int:
+    return (offset + 7) // 8 * 8
+
+
+def get_snapshot_dir() -> Optional[str]:
+    return getattr(settings, 'GLOSSARY_SNAPSHOT_DIR', None)
+
+
+def get_snapshot_path(version_id: int, revision: int) -> str:
+    return os.path.join(get_snapshot_dir(),
+                        FILE_NAME.format(version_id, revision))
+
+
+class VersionSnapshot:
+    """
+    Read-only sequence of (element_id, code, value) rows of version mapped
+    from snapshot file, supports membership test of (code, value) pairs by
+    binary search.
+    """
+
+    def __init__(self, path: str):
+        with open(path, 'rb') as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        buffer = memoryview(self._mmap)
+        magic, _, _, count, strings_count = HEADER.unpack_from(buffer)
+        if magic != MAGIC:
+            raise ValueError(f'{path} is not snapshot of this platform')
+
+        offset = HEADER.size
+        sections = {}
+        for name, item_format, size in (('element_ids', 'q', count),
+                                        ('code_refs', 'I', count),
+                                        ('value_refs', 'I', count),
+                                        ('code_order', 'I', count),
+                                        ('string_offsets', 'Q',
+                                         strings_count + 1)):
+            offset = _align(offset)
+            end = offset + size * array(item_format).itemsize
+            sections[name] = buffer[offset:end].cast(item_format)
+            offset = end
+
+        self._count = count
+        self._element_ids = sections['element_ids']
+        self._code_refs = sections['code_refs']
+        self._value_refs = sections['value_refs']
+        self._code_order = sections['code_order']
+        self._string_offsets = sections['string_offsets']
+        self._blob = buffer[offset:]
+
+    def _get_string(self, index: int) -> str:
+        start = self._string_offsets[index]
+        end = self._string_offsets[index + 1]
+        return str(self._blob[start:end], 'utf-8')
+
+    def _get_row(self, position: int) -> tuple:
+        return (self._element_ids[position],
+                self._get_string(self._code_refs[position]),
+                self._get_string(self._value_refs[position]))
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return [self._get_row(position)
+                    for position in range(*item.indices(self._count))]
+        if not -self._count <= item < self._count:
+            raise IndexError('snapshot index out of range')
+        return self._get_row(item % self._count)
+
+    def __iter__(self) -> Iterator[tuple]:
+        for position in range(self._count):
+            yield self._get_row(position)
+
+    def __contains__(self, element: tuple) -> bool:
+        code, value = element
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            position = self._code_order[middle]
+            middle_code = self._get_string(self._code_refs[position])
+            if middle_code < code:
+                low = middle + 1
+            elif middle_code > code:
+                high = middle
+            else:
+                return self._get_string(self._value_refs[position]) == value
+        return False
+
+
+def write_version_snapshot(version_id: int) -> Optional[str]:
+    """
+    Writes snapshot of version's elements for its current revision and
+    removes snapshots of previous revisions if GLOSSARY_SNAPSHOT_DIR setting
+    is set. Returns path of snapshot.
+    """
+
+    if not get_snapshot_dir():
+        return
+
+    revision = Version.objects.filter(
+        pk=version_id
+    ).values_list(
+        'revision', flat=True
+    ).first()
+    if revision is None:
+        return
+
+    element_ids, code_refs, value_refs = array('q'), array('I'), array('I')
+    strings, string_indexes = [], {}
+    codes = []
+    rows = ElementInVersion.objects.filter(
+        version_id=version_id
+    ).order_by(
+        'code'
+    ).values_list(
+        'element_id', 'code', 'value'
+    )
+    for element_id, code, value in rows.iterator():
+        element_ids.append(element_id)
+        for string, refs in ((code, code_refs), (value, value_refs)):
+            index = string_indexes.get(string)
+            if index is None:
+                index = string_indexes[string] = len(strings)
+                strings.append(string.encode())
+            refs.append(index)
+        codes.append(code)
+
+    code_order = array('I', sorted(range(len(codes)),
+                                   key=codes.__getitem__))
+    string_offsets = array('Q', [0])
+    for string in strings:
+        string_offsets.append(string_offsets[-1] + len(string))
+
+    os.makedirs(get_snapshot_dir(), exist_ok=True)
+    path = get_snapshot_path(version_id, revision)
+    temporary_path = f'{path}.{os.getpid()}.tmp'
+    with open(temporary_path, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, version_id, revision,
+                               len(element_ids), len(strings)))
+        for section in (element_ids, code_refs, value_refs, code_order,
+                        string_offsets):
+            file.write(b'\0' * (_align(file.tell()) - file.tell()))
+            file.write(section.tobytes())
+        for string in strings:
+            file.write(string)
+    os.replace(temporary_path, path)
+
+    for stale_path in glob.glob(get_snapshot_path(version_id, '*')):
+        if stale_path != path:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(stale_path)
+
+    return path
+
+
+class SnapshotStore:
+    """Per-process registry of opened snapshots by version and revision."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshots = {}  # version_id: (revision, snapshot)
+
+    def is_enabled(self) -> bool:
+        return bool(get_snapshot_dir())
+
+    def get(self, version_id: int,
+            revision: int) -> Optional[VersionSnapshot]:
+        """Returns snapshot of version revision if it is published."""
+
+        if not self.is_enabled():
+            return
+
+        opened = self._snapshots.get(version_id)
+        if (opened is not None) and (opened[0] == revision):
+            return opened[1]
+
+        path = get_snapshot_path(version_id, revision)
+        try:
+            snapshot = VersionSnapshot(path)
+        except (OSError, ValueError):
+            with self._lock:
+                self._snapshots.pop(version_id, None)
+            return
+
+        with self._lock:
+            self._snapshots[version_id] = (revision, snapshot)
+        return snapshot
+
+    def clear(self) -> None:
+        with self._lock:
+            self._snapshots.clear()
+
+
+snapshots = SnapshotStore()
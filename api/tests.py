@@ -0,0 +1,1363 @@
+import asyncio
+import datetime as dt
+import io
+import json
+import os
+import tempfile
+import threading
+from unittest import mock, skipIf
+
+import django
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+from django.core.management import CommandError, call_command
+from django.db import connections
+from django.test import (SimpleTestCase, TestCase, TransactionTestCase,
+                         override_settings)
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from api.bloom import bloom_filter_stats
+from api.clock import Clock, clock
+from api.db import check_connections_health
+from api.diffs import get_version_diff, precompute_version_diff
+from api.importers import (GlossaryImporter, GlossaryImportError,
+                           iter_jsonl_rows)
+from api.routers import PRIMARY_COOKIE
+from api.search import (SQLITE_FTS_TRIGGERS, ensure_sqlite_fts_triggers,
+                        search_version_elements)
+from api.snapshots import (get_snapshot_path, snapshots,
+                           write_version_snapshot)
+from api.models import (ActualVersion, Element, ElementInVersion, Guide,
+                        Version)
+from api.metrics import (HISTOGRAMS, Histogram, install_query_recorder,
+                         record_query)
+from api.paginator import LimitedCountPaginator
+from api.serializers import (ElementSerializer, FastElementSerializer,
+                             FastGuideSerializer, FastVersionSerializer,
+                             GuideSerializer, VersionSerializer)
+from api.usecases import Glossary, validate_guides_elements
+from api.validation_index import ValidationIndex, validation_index
+
+
+# Second alias of test database used as replica in routing tests.
+REPLICA = 'test_replica'
+connections.databases.setdefault(REPLICA, {
+    **settings.DATABASES['default'],
+    'TEST': {'MIRROR': 'default'},
+})
+
+
+class GlossaryTestCase(TestCase):
+    """Guide with current and previous versions and their elements."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.guide = Guide.objects.create(title='Лекарства', short_title='med')
+        cls.old_version = Version.objects.create(
+            guide=cls.guide, name='1', start_date=dt.date(2021, 1, 1)
+        )
+        cls.version = Version.objects.create(
+            guide=cls.guide, name='2', start_date=dt.date(2021, 6, 1)
+        )
+        cls.element = Element.objects.create(code='1', value='аспирин')
+        ElementInVersion.objects.create(version=cls.old_version,
+                                        element=cls.element)
+        ElementInVersion.objects.create(version=cls.version,
+                                        element=cls.element)
+
+    def setUp(self):
+        cache.clear()
+        validation_index.clear()
+
+
+class ValidationIndexTest(GlossaryTestCase):
+    def test_version_elements_are_loaded_once(self):
+        glossary = Glossary(self.guide.pk, version_id=self.version.pk,
+                            element_data={'code': '1', 'value': 'аспирин'})
+        self.assertTrue(glossary.is_element_valid())
+
+        glossary = Glossary(self.guide.pk, version_id=self.version.pk,
+                            element_data={'code': '1', 'value': 'аспирин'})
+        with self.assertNumQueries(0):
+            self.assertTrue(glossary.is_element_valid())
+
+    def test_changed_elements_are_reloaded(self):
+        element = Element.objects.create(code='2', value='нурофен')
+        self.assertFalse(validation_index.is_element_in_version(
+            self.version.pk, ('2', 'нурофен')
+        ))
+
+        ElementInVersion.objects.create(version=self.version,
+                                        element=element)
+        self.assertTrue(validation_index.is_element_in_version(
+            self.version.pk, ('2', 'нурофен')
+        ))
+
+    def test_actual_version_on_date(self):
+        dates = {
+            dt.date(2020, 12, 31): None,
+            dt.date(2021, 1, 1): self.old_version.pk,
+            dt.date(2021, 5, 31): self.old_version.pk,
+            dt.date(2021, 6, 1): self.version.pk,
+        }
+        for date, version_id in dates.items():
+            with self.subTest(date=date):
+                self.assertEqual(
+                    validation_index.get_actual_version_id(self.guide.pk,
+                                                           date=date),
+                    version_id
+                )
+
+    def test_entries_expire(self):
+        index = ValidationIndex(timeout=0)
+        for _ in range(2):
+            with self.assertNumQueries(1):
+                index.get_version_elements(self.version.pk)
+
+
+class GlossaryTest(GlossaryTestCase):
+    def test_guide_and_version_are_resolved_once(self):
+        glossary = Glossary(self.guide.pk, version_id=self.old_version.pk)
+        with self.assertNumQueries(1):
+            self.assertTrue(glossary.is_glossary_version_valid_for_guide())
+            self.assertEqual(glossary.get_version_object_by_id_or_none(),
+                             self.old_version)
+            self.assertEqual(glossary.get_guide_object_or_none(),
+                             self.guide)
+
+    def test_version_of_other_guide_is_not_valid(self):
+        guide = Guide.objects.create(title='Диагнозы', short_title='diag')
+        glossary = Glossary(guide.pk, version_id=self.version.pk)
+        self.assertFalse(glossary.is_glossary_version_valid_for_guide())
+        self.assertIsNone(
+            glossary.get_version_id_for_elem_validation_or_none()
+        )
+
+
+class ValidateBatchTest(GlossaryTestCase):
+    elements = [{'code': '2', 'value': 'нурофен'},
+                {'code': '1', 'value': 'аспирин'}]
+
+    def post(self, url, data):
+        return self.client.post(url, data, content_type='application/json')
+
+    def test_results_are_in_incoming_order(self):
+        url = f'/api/v1/guides/{self.guide.pk}/validate-batch/'
+        for query in ('', '?stream=1'):
+            with self.subTest(query=query):
+                response = self.post(url + query, self.elements)
+                content = (b''.join(response.streaming_content)
+                           if response.streaming else response.content)
+                self.assertEqual(json.loads(content), [
+                    {'code': '2', 'value': 'нурофен', 'valid': False},
+                    {'code': '1', 'value': 'аспирин', 'valid': True},
+                ])
+
+    def test_pointed_version_not_valid_for_guide(self):
+        guide = Guide.objects.create(title='Диагнозы', short_title='diag')
+        response = self.post(
+            f'/api/v1/guides/{guide.pk}/versions/{self.version.pk}'
+            f'/validate-batch/',
+            self.elements
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_malformed_body(self):
+        url = f'/api/v1/guides/{self.guide.pk}/validate-batch/'
+        for data in ({'code': '1', 'value': 'аспирин'}, [{'code': 1}], ['1']):
+            with self.subTest(data=data):
+                self.assertEqual(self.post(url, data).status_code, 400)
+
+
+class ValidateGuidesElementsTest(GlossaryTestCase):
+    url = '/api/v1/validate/'
+
+    def post(self, data):
+        return self.client.post(self.url, data,
+                                content_type='application/json')
+
+    def test_results_in_incoming_order(self):
+        response = self.post([
+            {'guide_id': self.guide.pk, 'code': '1', 'value': 'аспирин'},
+            {'guide_id': self.guide.pk, 'version_id': self.old_version.pk,
+             'code': '1', 'value': 'нурофен'},
+            {'guide_id': self.guide.pk, 'date': '2021-02-01',
+             'code': '1', 'value': 'аспирин'},
+            {'guide_id': self.guide.pk, 'date': '2020-01-01',
+             'code': '1', 'value': 'аспирин'},
+            {'guide_id': 0, 'code': '1', 'value': 'аспирин'},
+        ])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(result['version_id'], result['valid'])
+             for result in response.data],
+            [(self.version.pk, True), (self.old_version.pk, False),
+             (self.old_version.pk, True), (None, False), (None, False)]
+        )
+        self.assertEqual(response.data[0], {
+            'guide_id': self.guide.pk, 'version_id': self.version.pk,
+            'code': '1', 'value': 'аспирин', 'valid': True,
+        })
+
+    def test_malformed_body_is_bad_request(self):
+        cases = {
+            'not list': {'guide_id': self.guide.pk, 'code': '1',
+                         'value': 'аспирин'},
+            'no guide': [{'code': '1', 'value': 'аспирин'}],
+            'guide string': [{'guide_id': str(self.guide.pk), 'code': '1',
+                              'value': 'аспирин'}],
+            'code number': [{'guide_id': self.guide.pk, 'code': 1,
+                             'value': 'аспирин'}],
+            'bad date': [{'guide_id': self.guide.pk, 'date': '01.02.2021',
+                          'code': '1', 'value': 'аспирин'}],
+            'version and date': [{'guide_id': self.guide.pk,
+                                  'version_id': self.version.pk,
+                                  'date': '2021-02-01', 'code': '1',
+                                  'value': 'аспирин'}],
+        }
+        for name, data in cases.items():
+            with self.subTest(name):
+                self.assertEqual(self.post(data).status_code, 400)
+
+
+class ActualVersionTest(GlossaryTestCase):
+    def get_actual_version(self):
+        return ActualVersion.objects.get(guide=self.guide)
+
+    def test_kept_by_version_changes(self):
+        actual_version = self.get_actual_version()
+        self.assertEqual(actual_version.version_id, self.version.pk)
+        self.assertIsNone(actual_version.effective_to)
+
+        next_start_date = clock.today() + dt.timedelta(days=10)
+        Version.objects.create(guide=self.guide, name='3',
+                               start_date=next_start_date)
+        actual_version = self.get_actual_version()
+        self.assertEqual(actual_version.version_id, self.version.pk)
+        self.assertEqual(actual_version.effective_to, next_start_date)
+
+        self.version.delete()
+        self.assertEqual(self.get_actual_version().version_id,
+                         self.old_version.pk)
+
+        self.guide.versions.all().delete()
+        self.assertFalse(ActualVersion.objects.exists())
+
+    def test_rollover_to_next_version(self):
+        next_version = Version.objects.create(
+            guide=self.guide, name='3',
+            start_date=clock.today() + dt.timedelta(days=10)
+        )
+        ActualVersion.objects.rollover(next_version.start_date)
+
+        actual_version = self.get_actual_version()
+        self.assertEqual(actual_version.version_id, next_version.pk)
+        self.assertEqual(actual_version.effective_from,
+                         next_version.start_date)
+        self.assertIsNone(actual_version.effective_to)
+
+
+class ClockTest(SimpleTestCase):
+    def test_date_changes_at_midnight(self):
+        test_clock = Clock()
+        before_midnight = timezone.make_aware(dt.datetime(2021, 6, 1, 23, 59))
+        after_midnight = before_midnight + dt.timedelta(minutes=2)
+
+        with mock.patch('django.utils.timezone.now',
+                        return_value=before_midnight), \
+                mock.patch('time.time',
+                           return_value=before_midnight.timestamp()):
+            self.assertEqual(test_clock.today(), dt.date(2021, 6, 1))
+            self.assertEqual(test_clock.seconds_until_tomorrow(), 61)
+
+        # date is memoized until midnight
+        with mock.patch.object(test_clock, '_compute_state',
+                               side_effect=AssertionError), \
+                mock.patch('time.time',
+                           return_value=before_midnight.timestamp() + 30):
+            self.assertEqual(test_clock.today(), dt.date(2021, 6, 1))
+
+        with mock.patch('django.utils.timezone.now',
+                        return_value=after_midnight), \
+                mock.patch('time.time',
+                           return_value=after_midnight.timestamp()):
+            self.assertEqual(test_clock.today(), dt.date(2021, 6, 2))
+
+    def test_override(self):
+        with clock.override(dt.date(2021, 1, 1)):
+            self.assertEqual(clock.today(), dt.date(2021, 1, 1))
+            self.assertTrue(clock.is_overridden)
+            self.assertIsNone(clock.seconds_until_tomorrow())
+        self.assertFalse(clock.is_overridden)
+
+
+class VersionResolutionTest(GlossaryTestCase):
+    def test_actual_versions_on_date(self):
+        dates = {
+            dt.date(2020, 12, 31): [],
+            dt.date(2021, 3, 1): [self.old_version.pk],
+            dt.date(2021, 6, 1): [self.version.pk],
+            None: [self.version.pk],
+        }
+        for date, versions_ids in dates.items():
+            with self.subTest(date=date):
+                self.assertEqual(
+                    list(Version.objects.actual_versions(
+                        date=date
+                    ).values_list('pk', flat=True)),
+                    versions_ids
+                )
+
+    def test_guides_list_on_search_date(self):
+        response = self.client.get('/api/v1/guides/?search_date=2021-03-01')
+        self.assertEqual(
+            [guide['version'] for guide in response.data['results']],
+            [self.old_version.name]
+        )
+
+    def test_resolve_versions(self):
+        future_version = Version.objects.create(
+            guide=self.guide, name='3',
+            start_date=clock.today() + dt.timedelta(days=1)
+        )
+        keys = [
+            (self.guide.pk, None, None),
+            (self.guide.pk, None, dt.date(2021, 3, 1)),
+            (self.guide.pk, self.old_version.pk, None),
+            (self.guide.pk, future_version.pk, None),
+            (self.guide.pk + 1, self.version.pk, None),
+        ]
+        with self.assertNumQueries(1):
+            resolved = Version.objects.resolve_versions(keys)
+        self.assertEqual(resolved, {
+            keys[0]: self.version.pk,
+            keys[1]: self.old_version.pk,
+            keys[2]: self.old_version.pk,
+        })
+
+
+class ElementInVersionTest(GlossaryTestCase):
+    def test_add_to_version_fills_code_and_value(self):
+        first = Element.objects.create(code='2', value='нурофен')
+        second = Element.objects.create(code='3', value='парацетамол')
+        self.version.elements.add(first, second)
+
+        self.assertEqual(
+            set(ElementInVersion.objects.filter(
+                version=self.version
+            ).values_list('code', 'value')),
+            {('1', 'аспирин'), ('2', 'нурофен'), ('3', 'парацетамол')}
+        )
+        glossary = Glossary(self.guide.pk,
+                            element_data={'code': '2', 'value': 'нурофен'})
+        self.assertTrue(glossary.is_element_valid())
+
+    def test_add_to_version_checks_uniqueness(self):
+        element = Element.objects.create(code='2', value='аспирин')
+        with self.assertRaises(ValidationError):
+            self.version.elements.add(element)
+
+
+class ElementAdminTest(GlossaryTestCase):
+    def setUp(self):
+        super().setUp()
+        user = get_user_model().objects.create_superuser(
+            'admin', 'admin@example.com', 'password'
+        )
+        self.client.force_login(user)
+
+    def test_search_by_code_or_value_prefix(self):
+        Element.objects.create(code='2', value='нурофен')
+        searches = {'1': ['1'], 'асп': ['1'], 'нур': ['2'], 'спир': []}
+        for search_term, codes in searches.items():
+            with self.subTest(search_term=search_term):
+                response = self.client.get('/admin/api/element/',
+                                           {'q': search_term})
+                self.assertEqual(
+                    [element.code
+                     for element in response.context['cl'].result_list],
+                    codes
+                )
+
+    def test_changelist_count_is_limited(self):
+        Element.objects.bulk_create(
+            Element(code=str(number), value=str(number))
+            for number in range(2, 6)
+        )
+        with mock.patch.object(LimitedCountPaginator, 'max_count', 3):
+            response = self.client.get('/admin/api/element/')
+        self.assertEqual(response.context['cl'].result_count, 3)
+
+    def test_new_element_with_repeated_value_is_form_error(self):
+        prefix = 'elementinversion_set'
+        response = self.client.post('/admin/api/element/add/', {
+            'code': '2',
+            'value': 'аспирин',
+            f'{prefix}-TOTAL_FORMS': '1',
+            f'{prefix}-INITIAL_FORMS': '0',
+            f'{prefix}-MIN_NUM_FORMS': '0',
+            f'{prefix}-MAX_NUM_FORMS': '1000',
+            f'{prefix}-0-version': str(self.version.pk),
+        })
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'such value in this version')
+        self.assertFalse(Element.objects.filter(code='2').exists())
+
+
+class CachedResponseTest(GlossaryTestCase):
+    def test_changes_reset_cached_responses(self):
+        url = f'/api/v1/guides/{self.guide.pk}/'
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            self.client.get(url)
+
+        element = Element.objects.create(code='2', value='нурофен')
+        ElementInVersion.objects.create(version=self.version,
+                                        element=element)
+        response = self.client.get(url)
+        self.assertEqual(
+            [element['code'] for element in response.data['results']],
+            ['1', '2']
+        )
+
+    def test_elements_changes_of_other_guides_keep_cache(self):
+        guide = Guide.objects.create(title='Диагнозы', short_title='diag')
+        version = Version.objects.create(guide=guide, name='1',
+                                         start_date=dt.date(2021, 1, 1))
+        url = f'/api/v1/guides/{self.guide.pk}/versions/{self.version.pk}/'
+        self.client.get(url)
+
+        element = Element.objects.create(code='2', value='нурофен')
+        ElementInVersion.objects.create(version=version, element=element)
+        with self.assertNumQueries(0):
+            self.client.get(url)
+
+    @override_settings(ALLOWED_HOSTS=['a.example', 'b.example'])
+    def test_pagination_links_are_cached_per_host(self):
+        guide = Guide.objects.create(title='Диагнозы', short_title='diag')
+        Version.objects.create(guide=guide, name='1',
+                               start_date=dt.date(2021, 1, 1))
+        ActualVersion.objects.rollover_once()
+
+        for host in ('a.example', 'b.example'):
+            with self.subTest(host=host):
+                response = self.client.get('/api/v1/guides/?limit=1',
+                                           HTTP_HOST=host)
+                self.assertTrue(
+                    response.data['next'].startswith(f'http://{host}/')
+                )
+
+
+class FastSerializerTest(GlossaryTestCase):
+    def test_output_equals_model_serializers(self):
+        self.guide.description = 'лекарственные препараты'
+        self.guide.save()
+        guide_id = str(self.guide.pk)
+        versions = Version.objects.select_related('guide').order_by('pk')
+
+        cases = {
+            'elements': (
+                ElementSerializer([self.element], many=True,
+                                  context={'guide_id': guide_id}),
+                FastElementSerializer(
+                    ElementInVersion.objects.filter(
+                        version=self.version
+                    ).values_list(*FastElementSerializer.values_fields),
+                    guide_id=guide_id
+                )
+            ),
+            'guides': (
+                GuideSerializer(versions, many=True),
+                FastGuideSerializer(
+                    versions.values_list(*FastGuideSerializer.values_fields)
+                )
+            ),
+            'versions': (
+                VersionSerializer(versions, many=True),
+                FastVersionSerializer(
+                    versions.values_list(*FastVersionSerializer.values_fields)
+                )
+            ),
+        }
+        for name, (serializer, fast_serializer) in cases.items():
+            with self.subTest(name):
+                self.assertEqual(JSONRenderer().render(fast_serializer.data),
+                                 JSONRenderer().render(serializer.data))
+
+    def test_benchmark_checks_output(self):
+        stdout = io.StringIO()
+        call_command('benchmark_serializers', rows=10, repeat=1,
+                     stdout=stdout)
+        self.assertIn('elements', stdout.getvalue())
+
+
+class CursorPaginationTest(GlossaryTestCase):
+    def test_pages_follow_codes(self):
+        Element.objects.bulk_create(
+            Element(code=str(number), value=f'элемент {number}')
+            for number in range(2, 6)
+        )
+        self.version.elements.add(*Element.objects.exclude(code='1'))
+
+        url = (f'/api/v1/guides/{self.guide.pk}/versions/{self.version.pk}/'
+               f'?pagination=cursor&limit=2')
+        codes, counts = [], []
+        while url:
+            response = self.client.get(url)
+            codes.extend(element['code']
+                         for element in response.data['results'])
+            counts.append(response.data.get('count'))
+            url = response.data['next']
+        self.assertEqual(codes, ['1', '2', '3', '4', '5'])
+        self.assertEqual(counts, [5, 5, 5])
+
+    def test_count_is_skipped(self):
+        response = self.client.get(
+            f'/api/v1/guides/{self.guide.pk}/versions/{self.version.pk}/'
+            f'?pagination=cursor&skip_count=true'
+        )
+        self.assertNotIn('count', response.data)
+        self.assertEqual(len(response.data['results']), 1)
+
+
+class GuideAdminTest(GlossaryTestCase):
+    def test_changelist_shows_actual_versions_without_extra_queries(self):
+        user = get_user_model().objects.create_superuser(
+            'admin', 'admin@example.com', 'password'
+        )
+        self.client.force_login(user)
+        ActualVersion.objects.rollover_once()
+        self.client.get('/admin/api/guide/')
+
+        with CaptureQueriesContext(connections['default']) as queries:
+            response = self.client.get('/admin/api/guide/')
+        for number in range(5):
+            guide = Guide.objects.create(title=f'Справочник {number}',
+                                         short_title=f'guide{number}')
+            Version.objects.create(guide=guide, name='1',
+                                   start_date=dt.date(2021, 1, 1))
+        with self.assertNumQueries(len(queries)):
+            self.client.get('/admin/api/guide/')
+
+        guide = response.context['cl'].result_list[0]
+        self.assertEqual(guide.actual_version_name, self.version.name)
+        self.assertEqual(guide.actual_version_date, self.version.start_date)
+
+
+class ConditionalResponseTest(GlossaryTestCase):
+    def test_not_modified_until_elements_change(self):
+        url = f'/api/v1/guides/{self.guide.pk}/versions/{self.version.pk}/'
+        response = self.client.get(url)
+        etag = response['ETag']
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        element = Element.objects.create(code='2', value='нурофен')
+        ElementInVersion.objects.create(version=self.version,
+                                        element=element)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_actual_version_change_is_not_reported_as_not_modified(self):
+        next_version = Version.objects.create(
+            guide=self.guide, name='3', start_date=dt.date(2022, 1, 1)
+        )
+        # next version is edited before it becomes actual
+        Version.objects.update(updated_at=timezone.make_aware(
+            dt.datetime(2021, 12, 1)
+        ))
+        url = f'/api/v1/guides/{self.guide.pk}/'
+        with clock.override(dt.date(2021, 12, 31)):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+        with clock.override(next_version.start_date):
+            response = self.client.get(
+                url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+            )
+        self.assertEqual(response.status_code, 200)
+
+
+class ExportTest(GlossaryTestCase):
+    def export(self, query=''):
+        response = self.client.get(
+            f'/api/v1/guides/{self.guide.pk}/versions/{self.version.pk}'
+            f'/export/{query}'
+        )
+        if response.streaming:
+            return response, b''.join(response.streaming_content).decode()
+        return response, response.content.decode()
+
+    def test_csv_export(self):
+        element = Element.objects.create(code='0', value='нурофен, 200')
+        ElementInVersion.objects.create(version=self.version,
+                                        element=element)
+        response, content = self.export('?file_format=csv')
+
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertEqual(content.splitlines(), [
+            'id,code,value,guide_id',
+            f'{element.pk},0,"нурофен, 200",{self.guide.pk}',
+            f'{self.element.pk},1,аспирин,{self.guide.pk}',
+        ])
+
+    def test_unknown_format(self):
+        response, _ = self.export('?file_format=xml')
+        self.assertEqual(response.status_code, 400)
+
+    def test_export_guide_id_matches_elements_list(self):
+        url = f'/api/v1/guides/{self.guide.pk}/versions/{self.version.pk}/'
+        listed = self.client.get(url).json()
+        exported = self.client.get(url + 'export/')
+        rows = b''.join(exported.streaming_content).decode().splitlines()
+
+        self.assertEqual(json.loads(rows[0])['guide_id'],
+                         listed['results'][0]['guide_id'])
+        self.assertEqual(json.loads(rows[0])['guide_id'], str(self.guide.pk))
+
+
+class ImportTest(GlossaryTestCase):
+    def test_rows_are_imported_by_batches(self):
+        rows = [
+            {'code': '1', 'value': 'аспирин'},
+            {'code': '2', 'value': 'нурофен'},
+            {'code': '2', 'value': 'парацетамол'},
+            {'code': '3', 'value': 'аспирин'},
+            {'code': '4'},
+            {'code': '5', 'value': 'анальгин'},
+        ]
+        progress = []
+        result = GlossaryImporter(
+            self.version, batch_size=2,
+            progress_callback=lambda result: progress.append(result.rows)
+        ).import_rows(rows)
+
+        self.assertEqual(progress, [2, 4, 6])
+        self.assertEqual(result.linked, 2)
+        self.assertEqual(result.already_in_version, 1)
+        self.assertEqual(result.rejected, [(3, 'code in version'),
+                                           (4, 'value in version'),
+                                           (5, 'no code/value')])
+        self.assertEqual(
+            set(ElementInVersion.objects.filter(
+                version=self.version
+            ).values_list('code', 'value')),
+            {('1', 'аспирин'), ('2', 'нурофен'), ('5', 'анальгин')}
+        )
+
+    def test_malformed_jsonl_rows_are_reported_with_line_number(self):
+        for line in ('{"code": "2"', '["2", "нурофен"]'):
+            file = io.StringIO('{"code": "2", "value": "нурофен"}\n'
+                               '\n' + line + '\n')
+            with self.subTest(line=line), \
+                    self.assertRaisesMessage(GlossaryImportError, 'Line 3'):
+                list(iter_jsonl_rows(file))
+
+    def test_command_reads_csv_with_byte_order_mark(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'elements.csv')
+            with open(path, 'w', encoding='utf-8-sig', newline='') as file:
+                file.write('code,value\r\n2,нурофен\r\n')
+            call_command('import_glossary', path, guide='med',
+                         version_name=self.version.name,
+                         stdout=io.StringIO(), stderr=io.StringIO())
+
+        self.assertTrue(ElementInVersion.objects.filter(
+            version=self.version, code='2', value='нурофен'
+        ).exists())
+
+    def test_command_fails_on_malformed_jsonl(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'elements.jsonl')
+            with open(path, 'w', encoding='utf-8') as file:
+                file.write('["2", "нурофен"]\n')
+            with self.assertRaisesMessage(CommandError, 'Line 1'):
+                call_command('import_glossary', path, guide='med',
+                             version_name=self.version.name,
+                             stdout=io.StringIO())
+
+
+class GenerateGlossaryTest(TestCase):
+    def test_generates_guides_with_shared_elements(self):
+        call_command('generate_glossary', guides=2, versions=2,
+                     elements=10, shared=0.6, prefix='gen',
+                     stdout=io.StringIO())
+
+        self.assertEqual(Guide.objects.count(), 2)
+        first, second = Version.objects.filter(
+            guide__short_title='gen1'
+        ).order_by('start_date')
+        self.assertEqual(second.start_date - first.start_date,
+                         dt.timedelta(days=30))
+        first_ids = set(first.elements.values_list('id', flat=True))
+        second_ids = set(second.elements.values_list('id', flat=True))
+        self.assertEqual(len(first_ids), 10)
+        self.assertEqual(len(second_ids), 10)
+        self.assertEqual(len(first_ids & second_ids), 6)
+
+    def test_shared_out_of_range_is_command_error(self):
+        with self.assertRaisesMessage(CommandError, '--shared'):
+            call_command('generate_glossary', shared=2,
+                         stdout=io.StringIO())
+
+    def test_existing_guide_is_command_error(self):
+        Guide.objects.create(title='Сгенерированный', short_title='gen1',
+                             description='')
+        with self.assertRaisesMessage(CommandError, 'already exists'):
+            call_command('generate_glossary', guides=1, versions=1,
+                         elements=1, stdout=io.StringIO())
+
+
+class BenchmarkApiTest(GlossaryTestCase):
+    def test_writes_report(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'report.json')
+            call_command('benchmark_api', repeat=2, output=path,
+                         stdout=io.StringIO())
+            with open(path, encoding='utf-8') as file:
+                report = json.load(file)
+
+        self.assertEqual(report['dataset']['guides'], 1)
+        self.assertEqual(report['repeat'], 2)
+        self.assertEqual(
+            {(result['name'], result['mode'])
+             for result in report['results']},
+            {(name, mode) for name in ('guides_list', 'guide_retrieve',
+                                       'version_retrieve', 'guide_validate',
+                                       'version_validate')
+             for mode in ('warm', 'cold')}
+        )
+
+    def test_actual_version_without_elements_is_command_error(self):
+        ElementInVersion.objects.filter(version=self.version).delete()
+        ActualVersion.objects.rollover_once()
+        with self.assertRaisesMessage(CommandError, 'has no elements'):
+            call_command('benchmark_api', repeat=1, stdout=io.StringIO())
+
+
+class VersionDiffTest(GlossaryTestCase):
+    def get_diff(self, from_version_id):
+        return self.client.get(
+            f'/api/v1/guides/{self.guide.pk}/versions/{self.version.pk}'
+            f'/diff/?from={from_version_id}'
+        )
+
+    def test_added_and_removed_elements(self):
+        added = Element.objects.create(code='2', value='нурофен')
+        removed = Element.objects.create(code='3', value='анальгин')
+        self.version.elements.add(added)
+        self.old_version.elements.add(removed)
+
+        response = self.get_diff(self.old_version.pk)
+        guide_id = str(self.guide.pk)
+        self.assertEqual(response.data, {
+            'version': self.version.pk,
+            'from': self.old_version.pk,
+            'added': [{'id': added.pk, 'code': '2', 'value': 'нурофен',
+                       'guide_id': guide_id}],
+            'removed': [{'id': removed.pk, 'code': '3', 'value': 'анальгин',
+                         'guide_id': guide_id}],
+        })
+
+    def test_diff_is_cached_per_revisions(self):
+        with override_settings(GLOSSARY_PRECOMPUTE_DIFFS=True):
+            precompute_version_diff(self.version.pk)
+        self.version.refresh_from_db()
+        self.old_version.refresh_from_db()
+        with self.assertNumQueries(0):
+            diff = get_version_diff(self.version, self.old_version)
+        self.assertEqual(diff, {'added': [], 'removed': []})
+
+        element = Element.objects.create(code='2', value='нурофен')
+        self.version.elements.add(element)
+        self.version.refresh_from_db()
+        diff = get_version_diff(self.version, self.old_version)
+        self.assertEqual(diff['added'], [(element.pk, '2', 'нурофен')])
+
+    def test_version_of_other_guide(self):
+        guide = Guide.objects.create(title='Диагнозы', short_title='diag')
+        version = Version.objects.create(guide=guide, name='1',
+                                         start_date=dt.date(2021, 1, 1))
+        self.assertEqual(self.get_diff(version.pk).status_code, 404)
+
+
+class BloomFilterTest(GlossaryTestCase):
+    def test_missing_element_is_rejected_before_lookup(self):
+        self.assertTrue(validation_index.is_element_in_version(
+            self.version.pk, ('1', 'аспирин')
+        ))
+        self.assertIn(self.version.pk, validation_index._filters)
+        rejected_before = bloom_filter_stats._checks['rejected']
+
+        with mock.patch.object(validation_index, 'get_version_elements',
+                               side_effect=AssertionError), \
+                self.assertNumQueries(0):
+            self.assertFalse(validation_index.is_element_in_version(
+                self.version.pk, ('2', 'парацетамол')
+            ))
+        self.assertEqual(bloom_filter_stats._checks['rejected'],
+                         rejected_before + 1)
+
+    def test_guides_validation_skips_rejected_elements(self):
+        validation_index.get_version_elements(self.version.pk)
+        elements_data = [{'guide_id': self.guide.pk, 'version_id': None,
+                          'date': None, 'code': '2',
+                          'value': 'парацетамол'}]
+
+        # only versions are resolved, elements are not queried
+        with self.assertNumQueries(1):
+            self.assertEqual(validate_guides_elements(elements_data),
+                             [(self.version.pk, False)])
+
+    def test_snapshot_is_checked_by_filter(self):
+        with tempfile.TemporaryDirectory() as snapshot_dir, \
+                override_settings(GLOSSARY_SNAPSHOT_DIR=snapshot_dir):
+            write_version_snapshot(self.version.pk)
+            self.addCleanup(snapshots.clear)
+            rejected_before = bloom_filter_stats._checks['rejected']
+
+            with self.assertNumQueries(1):
+                self.assertTrue(validation_index.is_element_in_version(
+                    self.version.pk, ('1', 'аспирин')
+                ))
+            with self.assertNumQueries(0):
+                self.assertFalse(validation_index.is_element_in_version(
+                    self.version.pk, ('2', 'парацетамол')
+                ))
+
+            self.assertIn(self.version.pk, validation_index._filters)
+            self.assertEqual(bloom_filter_stats._checks['rejected'],
+                             rejected_before + 1)
+
+
+class SnapshotTest(GlossaryTestCase):
+    def setUp(self):
+        super().setUp()
+        snapshot_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(snapshot_dir.cleanup)
+        settings_override = override_settings(
+            GLOSSARY_SNAPSHOT_DIR=snapshot_dir.name
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.addCleanup(snapshots.clear)
+        self.snapshot_dir = snapshot_dir.name
+        self.url = (f'/api/v1/guides/{self.guide.pk}/versions/'
+                    f'{self.version.pk}/')
+        for code, value in (('10', 'ибупрофен'), ('2', 'анальгин')):
+            ElementInVersion.objects.create(
+                version=self.version,
+                element=Element.objects.create(code=code, value=value)
+            )
+        self.version.refresh_from_db()
+
+    def get_values(self):
+        return [element['value']
+                for element in self.client.get(self.url).data['results']]
+
+    def test_snapshot_rows_and_membership(self):
+        write_version_snapshot(self.version.pk)
+        snapshot = snapshots.get(self.version.pk, self.version.revision)
+
+        rows = list(ElementInVersion.objects.filter(
+            version=self.version
+        ).order_by(
+            'code'
+        ).values_list(
+            'element_id', 'code', 'value'
+        ))
+        self.assertEqual(len(snapshot), 3)
+        self.assertEqual(list(snapshot), rows)
+        self.assertEqual(snapshot[-1], rows[-1])
+        self.assertEqual(snapshot[1:], rows[1:])
+        with self.assertRaises(IndexError):
+            snapshot[3]
+        for element, expected in ((('1', 'аспирин'), True),
+                                  (('10', 'ибупрофен'), True),
+                                  (('2', 'анальгин'), True),
+                                  (('2', 'аспирин'), False),
+                                  (('3', 'анальгин'), False)):
+            with self.subTest(element=element):
+                self.assertIs(element in snapshot, expected)
+
+    def test_version_elements_are_read_from_snapshot(self):
+        write_version_snapshot(self.version.pk)
+        # bulk update sends no signals, so revision and snapshot are kept
+        ElementInVersion.objects.filter(version=self.version,
+                                        code='2').update(value='изменено')
+
+        self.assertEqual(self.get_values(),
+                         ['аспирин', 'ибупрофен', 'анальгин'])
+
+    def test_snapshot_is_not_used_after_change(self):
+        write_version_snapshot(self.version.pk)
+        ElementInVersion.objects.create(
+            version=self.version,
+            element=Element.objects.create(code='3', value='нурофен')
+        )
+        self.version.refresh_from_db()
+
+        self.assertIsNone(snapshots.get(self.version.pk,
+                                        self.version.revision))
+        self.assertIn('нурофен', self.get_values())
+
+    def test_publish_snapshots(self):
+        write_version_snapshot(self.version.pk)
+        stale_path = get_snapshot_path(self.version.pk,
+                                       self.version.revision)
+        Version.objects.touch([self.version.pk])
+        self.version.refresh_from_db()
+
+        call_command('publish_snapshots', stdout=io.StringIO())
+
+        self.assertEqual(
+            sorted(os.listdir(self.snapshot_dir)),
+            sorted(os.path.basename(get_snapshot_path(version.pk,
+                                                      version.revision))
+                   for version in Version.objects.all())
+        )
+        self.assertFalse(os.path.exists(stale_path))
+
+    def test_publish_snapshots_without_dir_is_command_error(self):
+        with override_settings(GLOSSARY_SNAPSHOT_DIR=''), \
+                self.assertRaisesMessage(CommandError,
+                                         'GLOSSARY_SNAPSHOT_DIR'):
+            call_command('publish_snapshots', stdout=io.StringIO())
+
+
+class SearchTest(GlossaryTestCase):
+    def search_codes(self, value):
+        return [
+            code for _, code, _ in search_version_elements(self.version.pk,
+                                                           value=value)
+        ]
+
+    def test_matches_are_ranked(self):
+        Element.objects.bulk_create([
+            Element(code='10', value='аспирин кардио'),
+            Element(code='11', value='ацетилсалициловая кислота (аспирин)'),
+            Element(code='2', value='нурофен'),
+        ])
+        self.version.elements.add(*Element.objects.exclude(code='1'))
+
+        self.assertEqual(self.search_codes('аспирин'), ['1', '10', '11'])
+        self.assertEqual(
+            [code for _, code, _ in search_version_elements(self.version.pk,
+                                                            code='1')],
+            ['1', '10', '11']
+        )
+
+    def test_search_endpoint(self):
+        response = self.client.get(
+            f'/api/v1/guides/{self.guide.pk}/versions/{self.old_version.pk}'
+            f'/search/?value=СПИР'
+        )
+        self.assertEqual(response.data['results'], [
+            {'id': self.element.pk, 'code': '1', 'value': 'аспирин',
+             'guide_id': str(self.guide.pk)}
+        ])
+
+        response = self.client.get(
+            f'/api/v1/guides/{self.guide.pk}/versions/search/'
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_value_search_ignores_case_of_non_ascii_letters(self):
+        for value in ('АС', 'аС', 'АСПИР', 'Аспирин'):
+            with self.subTest(value=value):
+                self.assertEqual(self.search_codes(value), ['1'])
+
+    def test_missing_fts_triggers_are_recreated_after_migrations(self):
+        if connections['default'].vendor != 'sqlite':
+            self.skipTest('FTS table is used on SQLite only')
+
+        with connections['default'].cursor() as cursor:
+            for name in SQLITE_FTS_TRIGGERS:
+                cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+        ensure_sqlite_fts_triggers(using='default')
+
+        element = Element.objects.create(code='2', value='нурофен')
+        ElementInVersion.objects.create(version=self.version,
+                                        element=element)
+        self.assertEqual(self.search_codes('нуроф'), ['2'])
+
+
+@override_settings(GLOSSARY_METRICS=True)
+class RequestMetricsTest(GlossaryTestCase):
+    def setUp(self):
+        super().setUp()
+        for histogram in HISTOGRAMS.values():
+            histogram.clear()
+        # test connection is created before metrics are enabled
+        connection = connections['default']
+        install_query_recorder(sender=None, connection=connection)
+        self.addCleanup(connection.execute_wrappers.remove, record_query)
+
+    def test_server_timing_and_log(self):
+        with self.assertLogs('api.metrics', 'INFO') as logs:
+            response = self.client.get('/api/v1/guides/')
+
+        self.assertRegex(response['Server-Timing'],
+                         r'^db;dur=[\d.]+;desc="[1-9]\d* queries", '
+                         r'count;dur=[\d.]+, serialize;dur=[\d.]+, '
+                         r'total;dur=[\d.]+$')
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['view'], 'guides.list')
+        self.assertEqual(record['status'], 200)
+        self.assertGreater(record['queries'], 0)
+
+    def test_prometheus_histograms(self):
+        with self.assertLogs('api.metrics', 'INFO'):
+            self.client.get('/api/v1/guides/')
+            response = self.client.get('/api/metrics/')
+
+        self.assertEqual(response.status_code, 200)
+        content = response.content.decode()
+        self.assertIn('# TYPE glossary_request_duration_seconds histogram',
+                      content)
+        self.assertIn('glossary_request_duration_seconds_count'
+                      '{view="guides.list",method="GET"} 1', content)
+        self.assertIn('glossary_request_queries_bucket'
+                      '{view="guides.list",method="GET",le="+Inf"} 1',
+                      content)
+
+    @override_settings(GLOSSARY_METRICS=False)
+    def test_disabled(self):
+        response = self.client.get('/api/v1/guides/')
+
+        self.assertNotIn('Server-Timing', response)
+        self.assertEqual(self.client.get('/api/metrics/').status_code,
+                         404)
+
+
+class HistogramTest(SimpleTestCase):
+    def test_buckets_are_cumulative(self):
+        histogram = Histogram('test_seconds', 'Test.', (0.1, 1.0))
+        for value in (0.05, 0.5, 0.5, 5.0):
+            histogram.observe(('a',), value)
+
+        self.assertEqual(histogram.render(('view',))[2:], [
+            'test_seconds_bucket{view="a",le="0.1"} 1',
+            'test_seconds_bucket{view="a",le="1.0"} 3',
+            'test_seconds_bucket{view="a",le="+Inf"} 4',
+            'test_seconds_sum{view="a"} 6.05',
+            'test_seconds_count{view="a"} 4',
+        ])
+
+
+class DatabaseProfileTest(TestCase):
+    def test_element_lookup_indexes(self):
+        connection = connections['default']
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(
+                cursor, ElementInVersion._meta.db_table
+            )
+        self.assertEqual(
+            constraints['eiv_version_code_value_idx']['columns'],
+            ['version_id', 'code', 'value']
+        )
+
+    def test_sqlite_pragmas(self):
+        connection = connections['default']
+        if connection.vendor != 'sqlite':
+            self.skipTest('pragmas are set on SQLite only')
+
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+            cursor.execute('PRAGMA temp_store')
+            self.assertEqual(cursor.fetchone()[0], 2)  # MEMORY
+
+
+class ConnectionHealthTest(TestCase):
+    def check_health(self, **options):
+        connection = connections['default']
+        connection.ensure_connection()
+        with mock.patch.dict(connection.settings_dict, options), \
+                mock.patch.object(connection, 'is_usable') as is_usable:
+            check_connections_health(sender=None)
+        return is_usable.called
+
+    def test_disabled_by_default(self):
+        self.assertFalse(settings.DATABASES['default']['CONN_HEALTH_CHECKS'])
+
+    def test_only_persistent_connections_are_checked(self):
+        self.assertFalse(self.check_health(CONN_HEALTH_CHECKS=True,
+                                           CONN_MAX_AGE=0))
+        self.assertTrue(self.check_health(CONN_HEALTH_CHECKS=True,
+                                          CONN_MAX_AGE=60))
+
+
+class QueriesCountTest(GlossaryTestCase):
+    """Pins number of queries of endpoints with empty caches."""
+
+    def setUp(self):
+        super().setUp()
+        ActualVersion.objects.rollover_once()
+
+    def assertQueriesCount(self, count, url, status_code=200, data=None):
+        with self.assertNumQueries(count):
+            if data is None:
+                response = self.client.get(url)
+            else:
+                response = self.client.post(url, data,
+                                            content_type='application/json')
+            if response.streaming:
+                b''.join(response.streaming_content)
+        self.assertEqual(response.status_code, status_code)
+
+    def test_guides_list(self):
+        self.assertQueriesCount(3, '/api/v1/guides/')
+
+    def test_guides_list_does_not_depend_on_guides_count(self):
+        for number in range(5):
+            guide = Guide.objects.create(title=f'Справочник {number}',
+                                         short_title=f'guide{number}')
+            Version.objects.create(guide=guide, name='1',
+                                   start_date=dt.date(2021, 1, 1))
+        cache.clear()
+        self.assertQueriesCount(3, '/api/v1/guides/')
+
+    def test_guide_retrieve(self):
+        self.assertQueriesCount(3, f'/api/v1/guides/{self.guide.pk}/')
+
+    def test_guide_validate(self):
+        self.assertQueriesCount(
+            2,
+            f'/api/v1/guides/{self.guide.pk}/validate/?code=1&value=аспирин'
+        )
+
+    def test_guide_validate_missing_element(self):
+        self.assertQueriesCount(
+            2,
+            f'/api/v1/guides/{self.guide.pk}/validate/?code=2&value=нурофен',
+            status_code=404
+        )
+
+    def test_versions_list(self):
+        self.assertQueriesCount(
+            4, f'/api/v1/guides/{self.guide.pk}/versions/'
+        )
+
+    def test_version_retrieve(self):
+        self.assertQueriesCount(
+            3,
+            f'/api/v1/guides/{self.guide.pk}/versions/{self.old_version.pk}/'
+        )
+
+    def test_version_validate(self):
+        self.assertQueriesCount(
+            2,
+            f'/api/v1/guides/{self.guide.pk}/versions/{self.old_version.pk}'
+            f'/validate/?code=1&value=аспирин'
+        )
+
+    def test_guide_validate_batch(self):
+        self.assertQueriesCount(
+            2,
+            f'/api/v1/guides/{self.guide.pk}/validate-batch/',
+            data=[{'code': '1', 'value': 'аспирин'},
+                  {'code': '2', 'value': 'нурофен'}]
+        )
+
+    def test_version_validate_batch_stream(self):
+        self.assertQueriesCount(
+            2,
+            f'/api/v1/guides/{self.guide.pk}/versions/{self.old_version.pk}'
+            f'/validate-batch/?stream=1',
+            data=[{'code': '1', 'value': 'аспирин'},
+                  {'code': '2', 'value': 'нурофен'}]
+        )
+
+    def test_guides_validate(self):
+        self.assertQueriesCount(
+            3,
+            '/api/v1/validate/',
+            data=[
+                {'guide_id': self.guide.pk, 'code': '1',
+                 'value': 'аспирин'},
+                {'guide_id': self.guide.pk, 'version_id': self.old_version.pk,
+                 'code': '2', 'value': 'нурофен'},
+                {'guide_id': self.guide.pk, 'date': '2021-02-01',
+                 'code': '1', 'value': 'аспирин'},
+            ]
+        )
+
+    def test_version_export(self):
+        self.assertQueriesCount(
+            2,
+            f'/api/v1/guides/{self.guide.pk}/versions/{self.version.pk}'
+            f'/export/'
+        )
+
+    def test_version_diff(self):
+        self.assertQueriesCount(
+            4,
+            f'/api/v1/guides/{self.guide.pk}/versions/{self.version.pk}'
+            f'/diff/?from={self.old_version.pk}'
+        )
+
+    def test_actual_version_search(self):
+        self.assertQueriesCount(
+            3, f'/api/v1/guides/{self.guide.pk}/versions/search/?value=асп'
+        )
+
+    def test_version_search(self):
+        self.assertQueriesCount(
+            3,
+            f'/api/v1/guides/{self.guide.pk}/versions/{self.old_version.pk}'
+            f'/search/?code=1'
+        )
+
+    def test_cached_responses(self):
+        url = f'/api/v1/guides/{self.guide.pk}/'
+        self.client.get(url)
+        self.assertQueriesCount(0, url)
+
+
+@skipIf(django.VERSION >= (3, 1), 'async views are supported')
+class AsyncViewsConfigTest(SimpleTestCase):
+    @override_settings(GLOSSARY_ASYNC_VIEWS=True)
+    def test_async_views_require_django_3_1(self):
+        with self.assertRaises(ImproperlyConfigured):
+            apps.get_app_config('api').ready()
+
+
+@skipIf(django.VERSION >= (3, 0), 'WSGI wrapper is used by Django 2.2')
+class AsgiApplicationTest(SimpleTestCase):
+    def test_wsgi_requests_are_served_concurrently(self):
+        from glossary.asgi import PooledWsgiToAsgi
+
+        # both requests pass barrier only if they run at the same time
+        barrier = threading.Barrier(2, timeout=5)
+
+        def wsgi_application(environ, start_response):
+            barrier.wait()
+            start_response('200 OK', [('Content-Type', 'text/plain')])
+            return [threading.current_thread().name.encode()]
+
+        application = PooledWsgiToAsgi(wsgi_application, max_workers=2)
+
+        async def send_request():
+            messages = []
+
+            async def receive():
+                return {'type': 'http.request', 'body': b''}
+
+            async def send(message):
+                messages.append(message)
+
+            await application({
+                'type': 'http', 'method': 'GET', 'path': '/',
+                'query_string': b'', 'http_version': '1.1', 'headers': [],
+            }, receive, send)
+            return messages[1]['body']
+
+        async def send_requests():
+            return await asyncio.gather(send_request(), send_request())
+
+        thread_names = asyncio.run(send_requests())
+        self.assertEqual(len(set(thread_names)), 2)
+
+
+@override_settings(DATABASE_REPLICAS=[REPLICA], DATABASE_REPLICATION_LAG=0)
+class ReplicaRoutingTest(TransactionTestCase):
+    databases = {'default', REPLICA}
+
+    def setUp(self):
+        cache.clear()
+        validation_index.clear()
+        self.guide = Guide.objects.create(title='Лекарства',
+                                          short_title='med')
+        self.version = Version.objects.create(
+            guide=self.guide, name='1', start_date=dt.date(2021, 1, 1)
+        )
+        element = Element.objects.create(code='1', value='аспирин')
+        ElementInVersion.objects.create(version=self.version,
+                                        element=element)
+        ActualVersion.objects.rollover_once()
+
+    def get_queries_by_database(self, send_request):
+        with CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections[REPLICA]) as replica:
+            response = send_request()
+            if response.streaming:
+                b''.join(response.streaming_content)
+        return len(primary), len(replica)
+
+    def test_reads_go_to_replica(self):
+        primary, replica = self.get_queries_by_database(
+            lambda: self.client.get(f'/api/v1/guides/{self.guide.pk}/')
+        )
+        self.assertEqual(primary, 0)
+        self.assertGreater(replica, 0)
+
+    def test_streamed_export_reads_go_to_replica(self):
+        url = (f'/api/v1/guides/{self.guide.pk}/versions/'
+               f'{self.version.pk}/export/')
+        primary, replica = self.get_queries_by_database(
+            lambda: self.client.get(url)
+        )
+        self.assertEqual(primary, 0)
+        self.assertGreater(replica, 0)
+
+    def test_reads_after_write_go_to_primary(self):
+        self.client.cookies[PRIMARY_COOKIE] = '1'
+        primary, replica = self.get_queries_by_database(
+            lambda: self.client.get(f'/api/v1/guides/{self.guide.pk}/')
+        )
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
+
+    def test_read_only_post_requests_go_to_replica(self):
+        requests = {
+            'validate-batch': (
+                f'/api/v1/guides/{self.guide.pk}/validate-batch/',
+                [{'code': '1', 'value': 'аспирин'}]
+            ),
+            'validate': (
+                '/api/v1/validate/',
+                [{'guide_id': self.guide.pk, 'code': '1',
+                  'value': 'аспирин'}]
+            ),
+        }
+        for name, (url, data) in requests.items():
+            with self.subTest(name):
+                primary, replica = self.get_queries_by_database(
+                    lambda: self.client.post(url, data,
+                                             content_type='application/json')
+                )
+                self.assertEqual(primary, 0)
+                self.assertGreater(replica, 0)
+                self.assertNotIn(PRIMARY_COOKIE, self.client.cookies)
+
+    def test_admin_writes_go_to_primary_and_mark_client(self):
+        user = get_user_model().objects.create_superuser(
+            'admin', 'admin@example.com', 'password'
+        )
+        self.client.force_login(user)
+        prefix = 'elementinversion_set'
+        primary, replica = self.get_queries_by_database(
+            lambda: self.client.post('/admin/api/element/add/', {
+                'code': '2',
+                'value': 'нурофен',
+                f'{prefix}-TOTAL_FORMS': '0',
+                f'{prefix}-INITIAL_FORMS': '0',
+                f'{prefix}-MIN_NUM_FORMS': '0',
+                f'{prefix}-MAX_NUM_FORMS': '1000',
+            })
+        )
+
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
+        self.assertTrue(Element.objects.filter(code='2').exists())
+        self.assertIn(PRIMARY_COOKIE, self.client.cookies)
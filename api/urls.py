@@ -1,4 +1,5 @@
-from django.urls import include, path
+from django.conf import settings
+from django.urls import include, path, re_path
 from rest_framework.routers import DefaultRouter
 
 from api import views
@@ -12,6 +13,32 @@ router_v1.register(
     basename='versions',
 )
 
+
+def get_async_urlpatterns() -> list:
+    """Routes of async variants of retrieve and validation endpoints."""
+
+    from api import async_views
+
+    return [
+        re_path(r'^guides/(?P<pk>[^/.]+)/$',
+                async_views.guide_retrieve),
+        re_path(r'^guides/(?P<pk>[^/.]+)/validate/$',
+                async_views.guide_validate),
+        re_path(r'^guides/(?P<guide_id>\d+)/versions/(?P<pk>\d+)/$',
+                async_views.version_retrieve),
+        re_path(r'^guides/(?P<guide_id>\d+)/versions/(?P<pk>\d+)'
+                r'/validate/$',
+                async_views.version_validate),
+    ]
+
+
+async_urlpatterns_v1 = []
+if getattr(settings, 'GLOSSARY_ASYNC_VIEWS', False):
+    async_urlpatterns_v1 = get_async_urlpatterns()
+
 urlpatterns = [
-    path('v1/', include(router_v1.urls)),
+    path('v1/validate/', views.validate_guides_elements_view,
+         name='validate_guides_elements'),
+    path('v1/', include(async_urlpatterns_v1 + router_v1.urls)),
+    path('metrics/', views.metrics, name='metrics'),
 ]
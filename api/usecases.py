@@ -1,13 +1,26 @@
-from typing import Optional
+from typing import Iterable, Iterator, List, Optional
 
-from api.models import Guide, Element, Version
+from django.utils.functional import cached_property
+
+from api.clock import clock
+from api.models import ElementInVersion, Guide, Version
+from api.validation_index import validation_index
+
+
+def _get_id_or_none(value) -> Optional[int]:
+    try:
+        return int(value)
+    except (ValueError, TypeError):
+        return
 
 
 class Glossary:
     """
     Class created for operation with basic instances used in application and
-    includes Guide object id, Version object id and incoming data for
-    elements validation.
+    includes Guide object id, Version object id, incoming data for
+    elements validation and date for which guide's actual version is taken.
+    Resolved objects are memoized on instance, so one Glossary object should
+    be used during the whole request.
     If necessary, it could be extended for more handling with instances.
     """
 
@@ -16,61 +29,105 @@ class Glossary:
             guide_id,
             version_id: int = None,
             element_data: dict = {},
+            date=None,
     ):
         self._guide_id = guide_id
         self._version_id = version_id
         self._element_data = element_data
+        self._date = date
 
     def _get_element_attributes(self) -> tuple:
         code = self._element_data.get('code')
         value = self._element_data.get('value')
         return code, value
 
+    @cached_property
+    def _version(self) -> Optional[Version]:
+        """
+        Resolves guide's version with its guide in one query: version pointed
+        in Glossary class if it is valid for guide or guide's actual version.
+        """
+
+        guide_id = _get_id_or_none(self._guide_id)
+        if guide_id is None:
+            return
+
+        if self._version_id is None:
+            queryset = Version.objects.actual_versions(date=self._date)
+        else:
+            version_id = _get_id_or_none(self._version_id)
+            if version_id is None:
+                return
+            queryset = Version.objects.valid_versions().filter(pk=version_id)
+
+        return queryset.filter(
+            guide_id=guide_id
+        ).select_related(
+            'guide'
+        ).first()
+
+    @cached_property
+    def _version_id_for_validation(self) -> Optional[int]:
+        """Resolves the same version as _version through validation index."""
+
+        if '_version' in self.__dict__:
+            return getattr(self._version, 'pk', None)
+
+        guide_id = _get_id_or_none(self._guide_id)
+        if guide_id is None:
+            return
+
+        if self._version_id is None:
+            return validation_index.get_actual_version_id(guide_id,
+                                                          date=self._date)
+
+        version_id = _get_id_or_none(self._version_id)
+        if version_id is None:
+            return
+
+        version_info = validation_index.get_version_info(version_id)
+        if version_info is None:
+            return
+
+        version_guide_id, start_date = version_info
+        if (version_guide_id != guide_id) or (start_date > clock.today()):
+            return
+
+        return version_id
+
     def get_guide_object_or_none(self) -> Optional[Guide]:
         """Returns guide object initialized by guide_id in Glossary class"""
 
-        try:
-            guide_id = int(self._guide_id)
-        except (ValueError, TypeError):
-            return
+        if self._version is not None:
+            return self._version.guide
 
-        try:
-            guide = Guide.objects.get(pk=guide_id)
-        except Guide.DoesNotExist:
+        guide_id = _get_id_or_none(self._guide_id)
+        if guide_id is None:
             return
 
-        return guide
+        return Guide.objects.filter(pk=guide_id).first()
 
     def get_version_object_by_id_or_none(self) -> Optional[Version]:
         """
         Returns guide's version initialized by version_id in Glossary class.
         """
 
-        try:
-            version_id = int(self._version_id)
-        except ValueError:
+        if self._version_id is None:
             return
 
-        try:
-            version = Version.objects.get(pk=version_id)
-        except Version.DoesNotExist:
+        if self._version is not None:
+            return self._version
+
+        version_id = _get_id_or_none(self._version_id)
+        if version_id is None:
             return
 
-        return version
+        return Version.objects.filter(pk=version_id).first()
 
     def is_glossary_version_valid_for_guide(self) -> bool:
         """Returns if Glossary class version in guide's versions"""
 
-        guide = self.get_guide_object_or_none()
-        version = self.get_version_object_by_id_or_none()
-
-        if (version is not None) and (guide is not None):
-            guide_versions = guide.versions.valid_versions()
-
-            if version in guide_versions:
-                return True
-
-        return False
+        return (self._version_id is not None) and (self._version is not None)
 
     def get_version_for_elem_validation_or_none(self) -> Optional[Version]:
         """
@@ -79,39 +136,101 @@ class Glossary:
         If no one - looks for guide's actual version.
         """
 
-        guide = self.get_guide_object_or_none()
-        if guide is None:
-            return
-
-        if self._version_id is not None:
-            version = self.get_version_object_by_id_or_none()
-
-            if (version is not None
-                and self.is_glossary_version_valid_for_guide()):
-                return version
+        return self._version
 
-            return
+    def get_version_id_for_elem_validation_or_none(self) -> Optional[int]:
+        """
+        Returns id of guide's version applicable for validation or none.
+        Works the same way as get_version_for_elem_validation_or_none but
+        resolves version through in-memory validation index.
+        """
 
-        guide_version = guide.get_actual_version()
-        if guide_version is not None:
-            return guide_version
-
-        return
+        return self._version_id_for_validation
 
     def is_element_valid(self) -> bool:
-        """Validates if element in guide's version."""
+        """
+        Validates if element in guide's version.
+        Element is checked by version's Bloom filter and elements taken from
+        in-memory validation index which falls back to db on a miss.
+        """
 
-        version = self.get_version_for_elem_validation_or_none()
-        if version is None:
+        version_id = self.get_version_id_for_elem_validation_or_none()
+        if version_id is None:
             return False
 
         code, value = self._get_element_attributes()
         if (code is None) or (value is None):
             return False
 
-        try:
-            element = version.elements.get(code=code, value=value)
-        except Element.DoesNotExist:
-            return False
+        return validation_index.is_element_in_version(version_id,
+                                                      (code, value))
+
+    def iter_elements_validity(
+            self,
+            elements_data: Iterable[dict],
+    ) -> Iterator[bool]:
+        """
+        Validates many elements in guide's version resolved once.
+        Yields validation result for each element in incoming order.
+        """
+
+        version_id = self.get_version_id_for_elem_validation_or_none()
+        for element_data in elements_data:
+            code = element_data.get('code')
+            value = element_data.get('value')
+            yield (version_id is not None) and (
+                validation_index.is_element_in_version(version_id,
+                                                       (code, value))
+            )
+
+
+def validate_guides_elements(elements_data: List[dict]) -> List[tuple]:
+    """
+    Validates elements of different guides, each one in version pointed by
+    version_id, actual on date or actual on current date.
+    Versions of all elements are resolved by one query and elements of each
+    version are checked by one query. Elements rejected by Bloom filters of
+    versions loaded into validation index are not looked up.
+    Returns (version_id, is_valid) for each element in incoming order.
+    """
 
-        return True
+    versions_ids = Version.objects.resolve_versions(
+        (element_data['guide_id'], element_data.get('version_id'),
+         element_data.get('date'))
+        for element_data in elements_data
+    )
+
+    elements_versions = []  # (version_id, whether element is looked up)
+    versions_codes = {}
+    for element_data in elements_data:
+        version_id = versions_ids.get((element_data['guide_id'],
+                                       element_data.get('version_id'),
+                                       element_data.get('date')))
+        is_looked_up = (version_id is not None) and not (
+            validation_index.is_element_rejected(
+                version_id, (element_data['code'], element_data['value'])
+            )
+        )
+        elements_versions.append((version_id, is_looked_up))
+        if is_looked_up:
+            versions_codes.setdefault(version_id, set()).add(
+                element_data['code']
+            )
+
+    versions_elements = {
+        version_id: ElementInVersion.objects.find_elements(version_id, codes)
+        for version_id, codes in versions_codes.items()
+    }
+
+    return [
+        (
+            version_id,
+            is_looked_up and (
+                (element_data['code'], element_data['value'])
+                in versions_elements[version_id]
+            )
+        )
+        for element_data, (version_id, is_looked_up) in zip(
+            elements_data, elements_versions
+        )
+    ]
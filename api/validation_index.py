@@ -0,0 +1,215 @@
+import threading
+import time
+from bisect import bisect_right
+from typing import Container, Iterable, Optional, Tuple
+
+from django.conf import settings
+
+from api.bloom import (BloomFilter, bloom_filter_stats,
+                       get_false_positive_rate)
+from api.clock import clock
+from api.models import ElementInVersion, Version
+from api.snapshots import snapshots
+
+
+class ValidationIndex:
+    """
+    Per-process in-memory index used for elements validation.
+    Keeps guide's versions timeline for bisect lookup of version actual on
+    date, version's guide and start_date and (code, value) pairs of each
+    version: published snapshot of version (see api.snapshots) or frozen
+    set loaded once from db. Bloom filter of version is built when its
+    elements are loaded and is checked before them, so most of missing
+    elements are rejected without db queries or reading snapshot files.
+    Entries are dropped by model signals (see api.signals) and expire after
+    timeout, so changes made in other processes are picked up as well.
+    """
+
+    def __init__(self, timeout: Optional[int] = None):
+        self._timeout = timeout
+        self._lock = threading.Lock()
+        self._timelines = {}  # guide_id: (start_dates, versions_ids)
+        self._versions = {}  # version_id: (guide_id, start_date)
+        self._elements = {}  # version_id: container of (code, value)
+        self._filters = {}  # version_id: Bloom filter of elements
+
+    @property
+    def timeout(self) -> int:
+        if self._timeout is not None:
+            return self._timeout
+        return getattr(settings, 'VALIDATION_INDEX_TIMEOUT', 60)
+
+    def _get(self, storage: dict, key):
+        """Returns (True, value) for alive entry or (False, None) on miss."""
+        entry = storage.get(key)
+        if entry is None:
+            return False, None
+
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            storage.pop(key, None)
+            return False, None
+
+        return True, value
+
+    def _set(self, storage: dict, key, value) -> None:
+        with self._lock:
+            storage[key] = (time.monotonic() + self.timeout, value)
+
+    def get_version_timeline(self, guide_id: int) -> Tuple[tuple, tuple]:
+        """Returns start dates and ids of guide's versions in their order."""
+
+        found, timeline = self._get(self._timelines, guide_id)
+        if not found:
+            history = list(Version.objects.version_history(guide_id))
+            timeline = (
+                tuple(start_date for start_date, _ in history),
+                tuple(version_id for _, version_id in history),
+            )
+            self._set(self._timelines, guide_id, timeline)
+
+        return timeline
+
+    def get_actual_version_id(self, guide_id: int,
+                              date=None) -> Optional[int]:
+        """
+        Returns id of guide's version actual for given or current date
+        or none.
+        """
+
+        today = clock.today()
+        date = today if date is None else min(today, date)
+        start_dates, versions_ids = self.get_version_timeline(guide_id)
+        position = bisect_right(start_dates, date)
+        if position == 0:
+            return
+
+        return versions_ids[position - 1]
+
+    def get_version_info(self, version_id: int) -> Optional[Tuple]:
+        """Returns (guide_id, start_date) of version or none."""
+
+        found, info = self._get(self._versions, version_id)
+        if not found:
+            info = Version.objects.filter(
+                pk=version_id
+            ).values_list(
+                'guide_id', 'start_date'
+            ).first()
+            self._set(self._versions, version_id, info)
+
+        return info
+
+    def get_version_elements(self, version_id: int) -> Container[tuple]:
+        """
+        Returns container of (code, value) pairs of version's elements:
+        snapshot of version's current revision if it is published or frozen
+        set of pairs loaded from db. Bloom filter of loaded elements is
+        built as well.
+        """
+
+        found, elements = self._get(self._elements, version_id)
+        if not found:
+            elements = self._get_version_snapshot(version_id)
+            if elements is None:
+                elements = frozenset(
+                    ElementInVersion.objects.filter(
+                        version_id=version_id
+                    ).values_list(
+                        'code', 'value'
+                    )
+                )
+                self._set_version_filter(version_id, elements, len(elements))
+            else:
+                self._set_version_filter(
+                    version_id,
+                    ((code, value) for _, code, value in elements),
+                    len(elements)
+                )
+            self._set(self._elements, version_id, elements)
+
+        return elements
+
+    def _get_version_snapshot(self, version_id: int):
+        if not snapshots.is_enabled():
+            return
+
+        revision = Version.objects.filter(
+            pk=version_id
+        ).values_list(
+            'revision', flat=True
+        ).first()
+        if revision is None:
+            return
+
+        return snapshots.get(version_id, revision)
+
+    def _set_version_filter(self, version_id: int,
+                            elements: Iterable[tuple], count: int) -> None:
+        """Builds Bloom filter of count (code, value) pairs of version."""
+
+        false_positive_rate = get_false_positive_rate()
+        if not false_positive_rate:
+            return
+
+        bloom_filter = BloomFilter.from_elements(elements, count,
+                                                 false_positive_rate)
+        bloom_filter_stats.set_estimate(version_id,
+                                        bloom_filter.false_positive_rate)
+        self._set(self._filters, version_id, bloom_filter)
+
+    def is_element_rejected(self, version_id: int, element: tuple) -> bool:
+        """
+        Returns whether (code, value) pair is surely missing in version by
+        its Bloom filter if version's elements are loaded. Nothing is read
+        from db.
+        """
+
+        found, bloom_filter = self._get(self._filters, version_id)
+        return found and (element not in bloom_filter)
+
+    def is_element_in_version(self, version_id: int, element: tuple) -> bool:
+        """
+        Checks (code, value) pair by version's elements. Pairs are checked
+        by Bloom filter of loaded version first, so most of missing elements
+        are rejected before lookup in elements.
+        """
+
+        found, bloom_filter = self._get(self._filters, version_id)
+        if found and (element not in bloom_filter):
+            bloom_filter_stats.count('rejected')
+            return False
+
+        is_found = element in self.get_version_elements(version_id)
+        if found:
+            bloom_filter_stats.count('passed' if is_found
+                                     else 'false_positive')
+        return is_found
+
+    def invalidate_guide(self, guide_id: int) -> None:
+        with self._lock:
+            self._timelines.pop(guide_id, None)
+
+    def invalidate_version(self, version_id: int) -> None:
+        with self._lock:
+            self._versions.pop(version_id, None)
+            self._elements.pop(version_id, None)
+            self._filters.pop(version_id, None)
+        bloom_filter_stats.discard_estimate(version_id)
+
+    def invalidate_version_elements(self, version_id: int) -> None:
+        with self._lock:
+            self._elements.pop(version_id, None)
+            self._filters.pop(version_id, None)
+        bloom_filter_stats.discard_estimate(version_id)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._timelines.clear()
+            self._versions.clear()
+            self._elements.clear()
+            self._filters.clear()
+        bloom_filter_stats.clear_estimates()
+
+
+validation_index = ValidationIndex()
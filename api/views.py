@@ -1,47 +1,192 @@
+import datetime as dt
+import json
+from typing import Iterable, Iterator, Optional
+
+from django.db.models import Count, Max, Sum
+from django.http import Http404, HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from rest_framework import status
-from rest_framework.decorators import action
+from rest_framework.decorators import action, api_view
 from rest_framework.response import Response
 from rest_framework.viewsets import GenericViewSet, mixins
 
-from api.models import Guide, Version
-from api.paginator import CustomPagination
-from api.serializers import (ElementSerializer, GuideSerializer,
+from api.cache import get_cached_response
+from api.clock import clock
+from api.conditional import (get_conditional_or_full_response,
+                             get_last_modified, make_etag)
+from api.diffs import get_version_diff
+from api.exporters import (EXPORT_CONTENT_TYPES, EXPORT_WRITERS,
+                           iter_version_element_rows)
+from api.metrics import MetricsMixin, is_enabled, render_prometheus
+from api.models import ElementInVersion, Guide, Version
+from api.paginator import CustomPagination, ElementCursorPagination
+from api.routers import (iter_in_current_reads, read_only_view,
+                         request_reads)
+from api.search import search_version_elements
+from api.serializers import (FastElementSerializer, FastGuideSerializer,
+                             FastVersionSerializer, GuideSerializer,
                              SearchDateSerializer, VersionSerializer)
-from api.usecases import Glossary
+from api.snapshots import snapshots
+from api.usecases import Glossary, validate_guides_elements
 
 
 RESPONSE_MESSAGES = {
     'no_pointed_version_in_guide': 'Guide has not pointed version',
     'no_code_or_value_in_request': 'No code/value in parameters',
+    'no_elements_in_request': 'Request body should be list of code/value',
+    'no_guides_elements_in_request': (
+        'Request body should be list of guide_id/code/value with optional '
+        'version_id or date'
+    ),
+    'unknown_export_format': 'file_format should be one of: ndjson, csv',
+    'no_from_version_in_request': 'No from version in parameters',
+    'no_code_or_value_in_search': 'No code or value in parameters',
     'validation_success_text': 'element is valid',
     'validation_fail_text': 'no such element'
 }
 
+STREAM_CHUNK_SIZE = 1000
+
+
+def _is_elements_data_valid(elements_data) -> bool:
+    if not isinstance(elements_data, list):
+        return False
+
+    for element_data in elements_data:
+        if not isinstance(element_data, dict):
+            return False
+        if not (isinstance(element_data.get('code'), str)
+                and isinstance(element_data.get('value'), str)):
+            return False
+
+    return True
+
+
+def _parse_guides_elements_data(elements_data) -> Optional[list]:
+    """
+    Returns elements of guides from request body with parsed dates or none
+    if body is not list of guide_id/code/value with optional version_id or
+    date (YYYY-mm-dd).
+    """
+
+    if not isinstance(elements_data, list):
+        return
+
+    parsed_elements_data = []
+    for element_data in elements_data:
+        if not isinstance(element_data, dict):
+            return
+        if not (isinstance(element_data.get('code'), str)
+                and isinstance(element_data.get('value'), str)):
+            return
+
+        guide_id = element_data.get('guide_id')
+        version_id = element_data.get('version_id')
+        if type(guide_id) is not int:
+            return
+        if (version_id is not None) and (type(version_id) is not int):
+            return
+
+        date = element_data.get('date')
+        if date is not None:
+            if version_id is not None:
+                return
+            try:
+                date = dt.date.fromisoformat(date)
+            except (TypeError, ValueError):
+                return
+
+        parsed_elements_data.append({
+            'guide_id': guide_id,
+            'version_id': version_id,
+            'date': date,
+            'code': element_data['code'],
+            'value': element_data['value'],
+        })
+
+    return parsed_elements_data
+
+
+def _iter_json_array(items: Iterable[dict]) -> Iterator[str]:
+    """Yields JSON array of items by chunks of STREAM_CHUNK_SIZE items."""
+
+    yield '['
+    chunk = []
+    separator = ''
+    for item in items:
+        chunk.append(json.dumps(item, ensure_ascii=False,
+                                separators=(',', ':')))
+        if len(chunk) == STREAM_CHUNK_SIZE:
+            yield separator + ','.join(chunk)
+            separator = ','
+            chunk = []
+
+    if chunk:
+        yield separator + ','.join(chunk)
+    yield ']'
+
+
+def metrics(request):
+    """Returns request metrics of process in Prometheus text format."""
+
+    if not is_enabled():
+        raise Http404
+
+    return HttpResponse(render_prometheus(),
+                        content_type='text/plain; version=0.0.4; '
+                                     'charset=utf-8')
+
+
+@read_only_view
+@api_view(['POST'])
+def validate_guides_elements_view(request):
+    """
+    Validates list of elements of different guides, each one in version
+    pointed by version_id, actual on date or actual on current date.
+    Results are returned in incoming order.
+    """
+
+    elements_data = _parse_guides_elements_data(request.data)
+    if elements_data is None:
+        return Response(RESPONSE_MESSAGES['no_guides_elements_in_request'],
+                        status=status.HTTP_400_BAD_REQUEST)
+
+    results = [
+        {
+            'guide_id': element_data['guide_id'],
+            'version_id': version_id,
+            'code': element_data['code'],
+            'value': element_data['value'],
+            'valid': is_valid,
+        }
+        for element_data, (version_id, is_valid) in zip(
+            elements_data,
+            validate_guides_elements(elements_data)
+        )
+    ]
+    return Response(results, status=status.HTTP_200_OK)
+
 
-class ListRetrieveViewSet(mixins.ListModelMixin,
+class ListRetrieveViewSet(MetricsMixin,
+                          mixins.ListModelMixin,
                           mixins.RetrieveModelMixin,
                           GenericViewSet):
+    list_modified_fields = ('updated_at', 'start_date')
+    fast_serializer_class = None
+    read_only = False
 
-    def _validate_element_in_version(self, glossary: Glossary) -> Response:
-        version = glossary.get_version_for_elem_validation_or_none()
-        if version is None:
-            return Response(status=status.HTTP_400_BAD_REQUEST)
+    def dispatch(self, request, *args, **kwargs):
+        """
+        Reads data from replica database when it is up to date. Actions
+        with read_only option, e.g. batch validation, are routed as reads.
+        """
 
-        if glossary.is_element_valid():
-            return Response(RESPONSE_MESSAGES['validation_success_text'],
-                            status=status.HTTP_200_OK)
+        with request_reads(request, read_only=self.read_only):
+            return super().dispatch(request, *args, **kwargs)
 
-        return Response(RESPONSE_MESSAGES['validation_fail_text'],
-                        status=status.HTTP_404_NOT_FOUND)
-
-
-class GuideViewSet(ListRetrieveViewSet):
-    serializer_class = GuideSerializer
-    pagination_class = CustomPagination
+    def _get_search_date(self):
+        """Returns date from search_date parameter or current date."""
 
-    def get_queryset(self):
-        queryset = Version.objects.actual_versions()
         input_date = self.request.query_params.get('search_date')
 
         if input_date is not None:
@@ -52,43 +197,225 @@ class GuideViewSet(ListRetrieveViewSet):
             search_date = serializer.validated_data.get('search_date', None)
 
             if search_date is not None:
-                queryset = Version.objects.actual_versions(date=search_date)
+                return search_date
+
+        return clock.today()
+
+    def _get_etag(self, *parts) -> str:
+        return make_etag(self.request.get_full_path(),
+                         self.request.accepted_media_type,
+                         *parts)
+
+    def list(self, request, *args, **kwargs):
+        """
+        Returns list with ETag and Last-Modified computed by one aggregate
+        query, or 304 response if client's copy is not modified.
+        Responses are cached until guides are changed.
+        """
+
+        return get_cached_response(request, kwargs.get('guide_id'),
+                                   self._get_list_response)
+
+    def _get_list_response(self):
+        request = self.request
+        queryset = self.filter_queryset(self.get_queryset())
+        aggregates = queryset.aggregate(
+            count=Count('pk'),
+            ids_sum=Sum('pk'),
+            **{
+                f'modified_{position}': Max(field)
+                for position, field in enumerate(self.list_modified_fields)
+            }
+        )
+        modified_dates = [
+            aggregates[f'modified_{position}']
+            for position in range(len(self.list_modified_fields))
+            if aggregates[f'modified_{position}'] is not None
+        ]
+        last_modified = get_last_modified(*modified_dates)
+        etag = self._get_etag(aggregates['count'], aggregates['ids_sum'],
+                              *modified_dates)
+
+        def get_response():
+            rows = queryset.values_list(
+                *self.fast_serializer_class.values_fields
+            )
+            page = self.paginate_queryset(rows)
+            if page is not None:
+                serializer = self.fast_serializer_class(page)
+                return self.get_paginated_response(serializer.data)
 
-        return queryset
+            serializer = self.fast_serializer_class(rows)
+            return Response(serializer.data)
 
-    def retrieve(self, request, *args, **kwargs):
-        """Returns guide with actual version and it's elements."""
+        return get_conditional_or_full_response(request, etag, last_modified,
+                                                get_response)
 
-        guide_id = self.kwargs.get('pk')
-        glossary = Glossary(guide_id=guide_id)
-        guide = glossary.get_guide_object_or_none()  # django shortcut is not applicable since we show Version object to user.
+    def _get_version_elements_cursor_page(self, version: Version, guide_id):
+        """Returns page of version's elements by keyset pagination."""
 
-        if guide is None:
-            return Response(status=status.HTTP_404_NOT_FOUND)
+        paginator = ElementCursorPagination()
+        rows = ElementInVersion.objects.filter(
+            version_id=version.pk
+        ).values(
+            *FastElementSerializer.values_fields
+        )
+        page = paginator.paginate_queryset(rows, self.request, view=self)
+        serializer = FastElementSerializer(
+            (
+                [row[field] for field in FastElementSerializer.values_fields]
+                for row in page
+            ),
+            guide_id=guide_id
+        )
+        return paginator.get_paginated_response(serializer.data)
+
+    def _get_version_elements_response(self, version: Version, guide_id):
+        """
+        Returns paginated elements of version or 304 response if client's
+        copy of version's elements is not modified.
+        """
+
+        etag = self._get_etag(version.pk, version.revision)
+        last_modified = get_last_modified(version.updated_at,
+                                          version.start_date)
+
+        if self.request.query_params.get('pagination') == 'cursor':
+            return get_conditional_or_full_response(
+                self.request, etag, last_modified,
+                lambda: self._get_version_elements_cursor_page(version,
+                                                               guide_id)
+            )
 
-        guide_actual_version = guide.get_actual_version()
+        def get_response():
+            rows = snapshots.get(version.pk, version.revision)
+            if rows is None:
+                rows = ElementInVersion.objects.filter(
+                    version_id=version.pk
+                ).order_by(
+                    'code'
+                ).values_list(
+                    *FastElementSerializer.values_fields
+                )
 
-        if guide_actual_version is None:
-            return Response(status=status.HTTP_404_NOT_FOUND)
+            page = self.paginate_queryset(rows)
+            if page is not None:
+                serializer = FastElementSerializer(page, guide_id=guide_id)
+                return self.get_paginated_response(serializer.data)
+
+            serializer = FastElementSerializer(rows, guide_id=guide_id)
+            return Response(serializer.data)
+
+        return get_conditional_or_full_response(self.request, etag,
+                                                last_modified, get_response)
+
+    def _validate_element_in_version(self, glossary: Glossary) -> Response:
+        version_id = glossary.get_version_id_for_elem_validation_or_none()
+        if version_id is None:
+            return Response(status=status.HTTP_400_BAD_REQUEST)
+
+        if glossary.is_element_valid():
+            return Response(RESPONSE_MESSAGES['validation_success_text'],
+                            status=status.HTTP_200_OK)
 
-        elements = guide_actual_version.elements.all()
+        return Response(RESPONSE_MESSAGES['validation_fail_text'],
+                        status=status.HTTP_404_NOT_FOUND)
 
-        page = self.paginate_queryset(elements)
+    def _search_elements_in_version(self, glossary: Glossary) -> Response:
+        """
+        Returns paginated elements of version found by code prefix and
+        value substring from query parameters, best matches first.
+        """
+
+        code = self.request.query_params.get('code')
+        value = self.request.query_params.get('value')
+        if not (code or value):
+            return Response(RESPONSE_MESSAGES['no_code_or_value_in_search'],
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        version_id = glossary.get_version_id_for_elem_validation_or_none()
+        if version_id is None:
+            get_object_or_404(Guide, pk=self.kwargs.get('guide_id'))
+            return Response(status=status.HTTP_404_NOT_FOUND)
+
+        guide_id = self.kwargs.get('guide_id')
+        rows = search_version_elements(version_id, code=code, value=value)
+        page = self.paginate_queryset(rows)
         if page is not None:
-            serializer = ElementSerializer(
-                page,
-                many=True,
-                context={'guide_id': guide_id}
-            )
+            serializer = FastElementSerializer(page, guide_id=guide_id)
             return self.get_paginated_response(serializer.data)
 
-        serializer = ElementSerializer(
-            elements,
-            many=True,
-            context={'guide_id': guide_id}
-        )
+        serializer = FastElementSerializer(rows, guide_id=guide_id)
         return Response(serializer.data)
 
+    def _validate_elements_batch_in_version(self, request,
+                                            glossary: Glossary):
+        """
+        Validates list of code/value pairs from request body in version
+        resolved once. Results are streamed if stream parameter is passed.
+        """
+
+        elements_data = request.data
+        if not _is_elements_data_valid(elements_data):
+            return Response(RESPONSE_MESSAGES['no_elements_in_request'],
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        version_id = glossary.get_version_id_for_elem_validation_or_none()
+        if version_id is None:
+            return Response(status=status.HTTP_400_BAD_REQUEST)
+
+        results = (
+            {
+                'code': element_data['code'],
+                'value': element_data['value'],
+                'valid': is_valid,
+            }
+            for element_data, is_valid in zip(
+                elements_data,
+                glossary.iter_elements_validity(elements_data)
+            )
+        )
+
+        if request.query_params.get('stream') in ('1', 'true'):
+            return StreamingHttpResponse(_iter_json_array(results),
+                                         content_type='application/json')
+
+        return Response(list(results), status=status.HTTP_200_OK)
+
+
+class GuideViewSet(ListRetrieveViewSet):
+    serializer_class = GuideSerializer
+    fast_serializer_class = FastGuideSerializer
+    pagination_class = CustomPagination
+    list_modified_fields = ('updated_at', 'start_date',
+                            'guide__updated_at')
+
+    def get_queryset(self):
+        # list reads rows by values_list of fast serializer fields, so
+        # guide columns are joined without select_related.
+        return Version.objects.actual_versions(date=self._get_search_date())
+
+    def retrieve(self, request, *args, **kwargs):
+        """Returns guide with actual version and it's elements."""
+
+        return get_cached_response(request, kwargs.get('pk'),
+                                   self._get_retrieve_response)
+
+    def _get_retrieve_response(self):
+        guide_id = self.kwargs.get('pk')
+        glossary = Glossary(guide_id=guide_id, date=self._get_search_date())
+        # guide and its actual version are resolved by one query, so
+        # missing guide and guide without actual version are both 404
+        guide_actual_version = (
+            glossary.get_version_for_elem_validation_or_none()
+        )
+
+        if guide_actual_version is None:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+
+        return self._get_version_elements_response(guide_actual_version,
+                                                   guide_id)
+
     @action(methods=['GET'], detail=True, url_path=r'validate',
             url_name='validate_element')
     def validate_elements_in_actual_version(self, request, *args, **kwargs):
@@ -103,15 +430,32 @@ class GuideViewSet(ListRetrieveViewSet):
 
         glossary = Glossary(
             guide_id=kwargs.get('pk'),
-            element_data={'code': code, 'value': value}
+            element_data={'code': code, 'value': value},
+            date=self._get_search_date()
+        )
+        response = get_cached_response(
+            request,
+            kwargs.get('pk'),
+            lambda: self._validate_element_in_version(glossary=glossary)
         )
-        response = self._validate_element_in_version(glossary=glossary)
 
         return response
 
+    @action(methods=['POST'], detail=True, url_path=r'validate-batch',
+            url_name='validate_elements_batch', read_only=True)
+    def validate_elements_batch_in_actual_version(self, request,
+                                                  *args, **kwargs):
+        """Validates list of elements in guide with actual version"""
+
+        glossary = Glossary(guide_id=kwargs.get('pk'),
+                            date=self._get_search_date())
+        return self._validate_elements_batch_in_version(request=request,
+                                                        glossary=glossary)
+
 
 class VersionViewSet(ListRetrieveViewSet):
     serializer_class = VersionSerializer
+    fast_serializer_class = FastVersionSerializer
     pagination_class = CustomPagination
 
     def get_queryset(self):
@@ -121,34 +465,22 @@ class VersionViewSet(ListRetrieveViewSet):
 
     def retrieve(self, request, *args, **kwargs):
         """Returns guide elements of pointed version."""
-        guide_id = kwargs.get('guide_id')
-        guide = get_object_or_404(Guide, pk=guide_id)
+        return get_cached_response(request, kwargs.get('guide_id'),
+                                   self._get_retrieve_response)
+
+    def _get_retrieve_response(self):
+        guide_id = self.kwargs.get('guide_id')
         glossary = Glossary(
             guide_id=guide_id,
-            version_id=kwargs.get('pk')
+            version_id=self.kwargs.get('pk')
         )
 
         if not glossary.is_glossary_version_valid_for_guide():
+            get_object_or_404(Guide, pk=guide_id)
             return Response(status=status.HTTP_404_NOT_FOUND)
 
         version = glossary.get_version_object_by_id_or_none()
-        elements = version.elements.all()
-
-        page = self.paginate_queryset(elements)
-        if page is not None:
-            serializer = ElementSerializer(
-                page,
-                many=True,
-                context={'guide_id': guide_id}
-            )
-            return self.get_paginated_response(serializer.data)
-
-        serializer = ElementSerializer(
-            elements,
-            many=True,
-            context={'guide_id': guide_id}
-        )
-        return Response(serializer.data)
+        return self._get_version_elements_response(version, guide_id)
 
     @action(methods=['GET'], detail=True, url_path=r'validate',
             url_name='validate_element')
@@ -167,6 +499,148 @@ class VersionViewSet(ListRetrieveViewSet):
             version_id=kwargs.get('pk'),
             element_data={'code': code, 'value': value}
         )
-        response = self._validate_element_in_version(glossary=glossary)
+        response = get_cached_response(
+            request,
+            kwargs.get('guide_id'),
+            lambda: self._validate_element_in_version(glossary=glossary)
+        )
 
         return response
+
+    @action(methods=['POST'], detail=True, url_path=r'validate-batch',
+            url_name='validate_elements_batch', read_only=True)
+    def validate_elements_batch_in_pointed_version(self, request,
+                                                   *args, **kwargs):
+        """Validates list of elements in guide with pointed version"""
+
+        glossary = Glossary(
+            guide_id=kwargs.get('guide_id'),
+            version_id=kwargs.get('pk')
+        )
+        return self._validate_elements_batch_in_version(request=request,
+                                                        glossary=glossary)
+
+    @action(methods=['GET'], detail=False, url_path=r'search',
+            url_name='search_elements')
+    def search_elements_in_actual_version(self, request, *args, **kwargs):
+        """
+        Searches elements in guide's version actual for search_date or
+        current date.
+        """
+
+        glossary = Glossary(
+            guide_id=kwargs.get('guide_id'),
+            date=self._get_search_date()
+        )
+        return get_cached_response(
+            request,
+            kwargs.get('guide_id'),
+            lambda: self._search_elements_in_version(glossary=glossary)
+        )
+
+    @action(methods=['GET'], detail=True, url_path=r'search',
+            url_name='search_elements_in_version')
+    def search_elements_in_pointed_version(self, request, *args, **kwargs):
+        """Searches elements in pointed version."""
+
+        glossary = Glossary(
+            guide_id=kwargs.get('guide_id'),
+            version_id=kwargs.get('pk')
+        )
+        return get_cached_response(
+            request,
+            kwargs.get('guide_id'),
+            lambda: self._search_elements_in_version(glossary=glossary)
+        )
+
+    @action(methods=['GET'], detail=True, url_path=r'export',
+            url_name='export_elements')
+    def export_elements_of_pointed_version(self, request, *args, **kwargs):
+        """
+        Streams all elements of pointed version as NDJSON or CSV depending
+        on file_format parameter without pagination.
+        """
+
+        file_format = request.query_params.get('file_format', 'ndjson')
+        if file_format not in EXPORT_WRITERS:
+            return Response(RESPONSE_MESSAGES['unknown_export_format'],
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        glossary = Glossary(
+            guide_id=kwargs.get('guide_id'),
+            version_id=kwargs.get('pk')
+        )
+        if not glossary.is_glossary_version_valid_for_guide():
+            return Response(status=status.HTTP_404_NOT_FOUND)
+
+        version = glossary.get_version_object_by_id_or_none()
+
+        def get_response():
+            rows = iter_version_element_rows(version.pk,
+                                             kwargs.get('guide_id'))
+            response = StreamingHttpResponse(
+                iter_in_current_reads(EXPORT_WRITERS[file_format](rows)),
+                content_type=EXPORT_CONTENT_TYPES[file_format]
+            )
+            response['Content-Disposition'] = (
+                f'attachment; filename="version_{version.pk}.{file_format}"'
+            )
+            return response
+
+        return get_conditional_or_full_response(
+            request,
+            self._get_etag(version.pk, version.revision),
+            get_last_modified(version.updated_at, version.start_date),
+            get_response
+        )
+
+    @action(methods=['GET'], detail=True, url_path=r'diff',
+            url_name='diff')
+    def diff_with_version(self, request, *args, **kwargs):
+        """
+        Returns elements added to pointed version and removed from it
+        since version passed in from parameter.
+        """
+
+        if request.query_params.get('from') is None:
+            return Response(RESPONSE_MESSAGES['no_from_version_in_request'],
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        return get_cached_response(request, kwargs.get('guide_id'),
+                                   self._get_diff_response)
+
+    def _get_diff_response(self):
+        guide_id = self.kwargs.get('guide_id')
+        versions = []
+        for version_id in (self.kwargs.get('pk'),
+                           self.request.query_params.get('from')):
+            glossary = Glossary(guide_id=guide_id, version_id=version_id)
+            if not glossary.is_glossary_version_valid_for_guide():
+                get_object_or_404(Guide, pk=guide_id)
+                return Response(status=status.HTTP_404_NOT_FOUND)
+            versions.append(glossary.get_version_object_by_id_or_none())
+
+        version, from_version = versions
+
+        def get_response():
+            diff = get_version_diff(version, from_version)
+            return Response({
+                'version': version.pk,
+                'from': from_version.pk,
+                'added': FastElementSerializer(
+                    diff['added'], guide_id=guide_id
+                ).data,
+                'removed': FastElementSerializer(
+                    diff['removed'], guide_id=guide_id
+                ).data,
+            })
+
+        return get_conditional_or_full_response(
+            self.request,
+            self._get_etag(version.pk, version.revision,
+                           from_version.pk, from_version.revision),
+            get_last_modified(version.updated_at, version.start_date,
+                              from_version.updated_at,
+                              from_version.start_date),
+            get_response
+        )
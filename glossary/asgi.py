@@ -0,0 +1,51 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'glossary.settings')
+
+if django.VERSION >= (3, 0):
+    from django.core.asgi import get_asgi_application
+
+    application = get_asgi_application()
+else:
+    # Django 2.2 has no ASGI handler. WsgiToAsgi of asgiref runs WSGI
+    # application by thread sensitive sync_to_async, i.e. every request in
+    # one shared thread, so requests are run in bounded pool of
+    # ASYNC_DB_THREADS threads instead, each one with own db connections.
+    from asgiref.sync import sync_to_async
+    from asgiref.wsgi import WsgiToAsgi, WsgiToAsgiInstance
+    from django.conf import settings
+    from django.core.wsgi import get_wsgi_application
+
+    class PooledWsgiToAsgiInstance(WsgiToAsgiInstance):
+        def __init__(self, wsgi_application, executor: ThreadPoolExecutor):
+            super().__init__(wsgi_application)
+            self.executor = executor
+
+        async def run_wsgi_app(self, body):
+            # undecorated method of asgiref, run in pool instead
+            run_wsgi_app = WsgiToAsgiInstance.__dict__['run_wsgi_app'].func
+            await sync_to_async(run_wsgi_app, thread_sensitive=False,
+                                executor=self.executor)(self, body)
+
+    class PooledWsgiToAsgi(WsgiToAsgi):
+        """Serves WSGI application from pool of max_workers threads."""
+
+        def __init__(self, wsgi_application, max_workers: int):
+            super().__init__(wsgi_application)
+            self.executor = ThreadPoolExecutor(
+                max_workers=max_workers,
+                thread_name_prefix='glossary-wsgi'
+            )
+
+        async def __call__(self, scope, receive, send):
+            instance = PooledWsgiToAsgiInstance(self.wsgi_application,
+                                                self.executor)
+            await instance(scope, receive, send)
+
+    application = PooledWsgiToAsgi(
+        get_wsgi_application(),
+        max_workers=getattr(settings, 'ASYNC_DB_THREADS', 16)
+    )